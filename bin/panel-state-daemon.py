@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import socket
+import select
+import struct
+import fcntl
+import ctypes
+import signal
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+SIOCGIFADDR = 0x8915
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+
+DEBOUNCE = 0.1
+RESYNC = 60
+
+TARGET_FILE = os.path.expanduser("~/.config/bin/target/target.txt")
+STATE_FILE = os.path.join(os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}"),
+                          "dotfiles-gnome", "panel-state.json")
+
+def interface_ipv4(name):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            packed = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', name[:15].encode()))
+        except OSError:
+            return None
+    return socket.inet_ntoa(packed[20:24])
+
+def local_ipv4():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            s.connect(("1.1.1.1", 53))
+            return s.getsockname()[0]
+        except OSError:
+            return None
+
+def tun_interfaces():
+    interfaces = []
+    for name in os.listdir("/sys/class/net"):
+        if os.path.exists(f"/sys/class/net/{name}/tun_flags"):
+            try:
+                with open(f"/sys/class/net/{name}/ifindex") as f:
+                    interfaces.append((int(f.read()), name))
+            except (OSError, ValueError):
+                continue
+    return [name for _, name in sorted(interfaces)]
+
+def vpn_ipv4():
+    interfaces = tun_interfaces()
+    return interface_ipv4(interfaces[0]) if interfaces else None
+
+def target_info():
+    try:
+        with open(TARGET_FILE) as f:
+            fields = f.read().split()
+    except OSError:
+        return None
+    if len(fields) >= 2:
+        return {"ip": fields[0], "name": fields[1]}
+    return None
+
+def current_state():
+    return {"ethernet": local_ipv4(), "vpn": vpn_ipv4(), "target": target_info()}
+
+def publish(state):
+    os.makedirs(os.path.dirname(STATE_FILE), mode=0o700, exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+def unpublish():
+    try:
+        os.remove(STATE_FILE)
+    except FileNotFoundError:
+        pass
+
+def terminate(signum, frame):
+    sys.exit(0)
+
+def netlink_socket():
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+    sock.setblocking(False)
+    return sock
+
+def inotify_fd(directory):
+    libc = ctypes.CDLL(None, use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    os.makedirs(directory, exist_ok=True)
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+        raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+    return fd
+
+def drain(fd):
+    try:
+        while os.read(fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
+
+def main():
+    if "--once" in sys.argv:
+        print(json.dumps(current_state()))
+        return 0
+
+    signal.signal(signal.SIGTERM, terminate)
+    netlink = netlink_socket()
+    inotify = inotify_fd(os.path.dirname(TARGET_FILE))
+    state = current_state()
+    publish(state)
+
+    # The panel falls back to its own polling while the state file is absent.
+    try:
+        while True:
+            ready, _, _ = select.select([netlink, inotify], [], [], RESYNC)
+            if ready:
+                # Coalesce bursts (e.g. a VPN bringing up link, address and routes at once).
+                while ready:
+                    for source in ready:
+                        drain(source.fileno() if source is netlink else source)
+                    ready, _, _ = select.select([netlink, inotify], [], [], DEBOUNCE)
+            new_state = current_state()
+            if new_state != state:
+                state = new_state
+                publish(state)
+    finally:
+        unpublish()
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
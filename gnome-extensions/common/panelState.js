@@ -0,0 +1,34 @@
+import GLib from 'gi://GLib';
+import Gio from 'gi://Gio';
+
+// Copia única compartida: cada extensión enlaza a este archivo como ./panelState.js
+const STATE_FILE = GLib.build_filenamev([GLib.get_user_runtime_dir(), 'dotfiles-gnome', 'panel-state.json']);
+
+// Un rename atómico del daemon genera varios eventos; solo releemos en los que dejan el archivo listo o lo eliminan
+const RELEVANT_EVENTS = [
+    Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+    Gio.FileMonitorEvent.CREATED,
+    Gio.FileMonitorEvent.RENAMED,
+    Gio.FileMonitorEvent.MOVED_IN,
+    Gio.FileMonitorEvent.DELETED,
+];
+
+// Estado publicado por panel-state-daemon.py (null si el daemon no está activo)
+export const readPanelState = () => {
+    try {
+        const [success, contents] = Gio.File.new_for_path(STATE_FILE).load_contents(null);
+        return success ? JSON.parse(new TextDecoder().decode(contents)) : null;
+    } catch (error) {
+        return null;
+    }
+};
+
+export const watchPanelState = (callback) => {
+    const monitor = Gio.File.new_for_path(STATE_FILE).monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, null);
+    monitor.connect('changed', (_monitor, _file, _otherFile, eventType) => {
+        if (RELEVANT_EVENTS.includes(eventType)) {
+            callback(readPanelState());
+        }
+    });
+    return monitor;
+};
@@ -62,14 +62,32 @@ export class LocalIpIndicator extends PanelMenu.Button {
     }
 
     #startAutoUpdate() {
+        // Con panel-state-daemon activo solo se actualiza cuando cambia el estado
+        this._monitor = Utils.watchPanelState((state) => {
+            this.#updateLabel();
+            if (!state) this.#startPolling();
+        });
+        this.#startPolling();
+    }
+
+    #startPolling() {
         const refreshTime = 5;
+        if (this._timeout) return;
         this._timeout = GLib.timeout_add_seconds(GLib.PRIORITY_DEFAULT, refreshTime, () => {
+            if (Utils.readPanelState()) {
+                this._timeout = null;
+                return GLib.SOURCE_REMOVE;
+            }
             this.#updateLabel();
             return GLib.SOURCE_CONTINUE;
         });
     }
 
     destroy() {
+        if (this._monitor) {
+            this._monitor.cancel();
+            this._monitor = null;
+        }
         if (this._timeout) {
             GLib.source_remove(this._timeout);
             this._timeout = null;
@@ -1,9 +1,17 @@
-import GLib from 'gi://GLib';
 import Gio from 'gi://Gio';
 
+import { readPanelState } from './panelState.js';
+
+export { readPanelState, watchPanelState } from './panelState.js';
+
 Gio._promisify(Gio.Subprocess.prototype, 'communicate_utf8_async');
 
 export const getLocalIp = async () => {
+    const state = readPanelState();
+    if (state) {
+        return state.ethernet;
+    }
+
     // Usamos un comando más simple y confiable
     const ipCommand = ['sh', '-c', 'ip route get 1.1.1.1 | grep -oP "src \\K\\S+" 2>/dev/null || hostname -I | cut -d" " -f1'];
     
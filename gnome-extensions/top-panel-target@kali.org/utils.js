@@ -1,7 +1,16 @@
 import GLib from 'gi://GLib';
 import Gio from 'gi://Gio';
 
+import { readPanelState } from './panelState.js';
+
+export { readPanelState, watchPanelState } from './panelState.js';
+
 export const getTargetInfo = async () => {
+    const state = readPanelState();
+    if (state) {
+        return { ipAddress: state.target?.ip ?? null, machineName: state.target?.name ?? null };
+    }
+
     const filePath = GLib.build_filenamev([GLib.get_home_dir(), '.config', 'bin', 'target', 'target.txt']);
     const file = Gio.File.new_for_path(filePath);
 
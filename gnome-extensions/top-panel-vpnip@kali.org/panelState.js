@@ -0,0 +1 @@
+../common/panelState.js
\ No newline at end of file
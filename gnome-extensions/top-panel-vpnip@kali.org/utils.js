@@ -1,10 +1,18 @@
-import GLib from 'gi://GLib';
 import Gio from 'gi://Gio';
 
+import { readPanelState } from './panelState.js';
+
+export { readPanelState, watchPanelState } from './panelState.js';
+
 // Promisificar la función
 Gio._promisify(Gio.Subprocess.prototype, 'communicate_utf8_async');
 
 export const getVpnIp = async () => {
+    const state = readPanelState();
+    if (state) {
+        return state.vpn;
+    }
+
     try {
         // Comando para obtener la IP de la VPN
         const ipCommand = ['sh', '-c', 'ip a show "$(ip tuntap show | cut -d : -f1 | head -n 1)" 2>/dev/null'];
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+import os
+import io
+import sys
+import json
+import re
+import time
+import shutil
+import hashlib
+import tarfile
+import zlib
+import struct
+import zipfile
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.server
+from functools import partial
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+
+LOGGING_STUBS = [
+    'apt', 'apt-get', 'gsettings', 'dconf', 'gnome-extensions', 'update-grub', 'fc-cache',
+    'systemctl', 'make', 'msgfmt', 'xdg-user-dir', 'gdbus', 'kitty', 'terminator', 'zsh'
+]
+
+STUB = """#!/bin/sh
+printf '%s\\t%s\\n' "$(date +%s.%N)" "$(basename "$0") $*" >> "{calls}"
+{body}
+"""
+
+STUB_BODIES = {
+    'sudo': 'while [ $# -gt 0 ]; do case "$1" in -*) shift ;; *) break ;; esac; done\n[ $# -eq 0 ] || exec "$@"',
+    'runuser': 'while [ $# -gt 0 ] && [ "$1" != "--" ]; do shift; done\nshift\nexec "$@"',
+    'dbus-run-session': 'while [ $# -gt 0 ] && [ "$1" != "--" ]; do shift; done\nshift\nexec "$@"',
+    'gnome-shell': 'echo "GNOME Shell 46.0"',
+    'dpkg-query': 'exit 1',
+}
+
+DPKG_STATUS = """Package: gnome-shell
+Status: install ok installed
+Version: 46.0-1
+
+Package: dconf-cli
+Status: install ok installed
+Version: 0.40.0-4
+
+"""
+
+def png(width=16, height=9):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + b'\x20\x40\x60' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        path = self.translate_path(self.path)
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        start = int(match.group(1))
+        end = min(int(match.group(2) or size - 1), size - 1)
+        if start > end:
+            self.send_error(416)
+            return None
+        with open(path, 'rb') as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        self.send_response(206)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Last-Modified', self.date_time_string(int(os.path.getmtime(path))))
+        self.end_headers()
+        return io.BytesIO(body)
+
+class FakeRoot:
+
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.join(path, 'root')
+        self.home = os.path.join(self.root, 'home', 'harness')
+        self.bin = os.path.join(path, 'bin')
+        self.remote = os.path.join(path, 'remote')
+        self.source = os.path.join(path, 'src')
+        self.calls = os.path.join(path, 'calls.log')
+        self.server = None
+
+    def write(self, path, content, mode=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb' if isinstance(content, bytes) else 'w') as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(path, mode)
+
+    def git(self, *args, cwd=None):
+        subprocess.run(['git', '-c', 'user.name=harness', '-c', 'user.email=harness@localhost',
+                        '-c', 'init.defaultBranch=master'] + list(args),
+                       cwd=cwd, check=True, capture_output=True)
+
+    def repo(self, name, files, tag=None):
+        path = os.path.join(self.remote, f"{name}.git")
+        for relpath, (content, mode) in files.items():
+            self.write(os.path.join(path, relpath), content, mode)
+        self.git('init', '--quiet', cwd=path)
+        self.git('add', '.', cwd=path)
+        self.git('commit', '--quiet', '-m', name, cwd=path)
+        if tag:
+            self.git('tag', tag, cwd=path)
+        return path
+
+    def stage_source(self):
+        shutil.copytree(SCRIPT_DIR, self.source, symlinks=True,
+                        ignore=shutil.ignore_patterns('.git', '__pycache__', 'install.log', 'install-trace*.json'))
+        stand_ins = {
+            'JetBrainsMono.zip': None,
+            'wallpaper/kali-simple-3840x2160.png': png(),
+            'wallpaper/browser-home-page-banner.jpg': b'\xff\xd8\xff\xe0harness\xff\xd9',
+            'wallpaper/grub-16x9.png': png(),
+            'wallpaper/grub-4x3.png': png(4, 3)
+        }
+        for relpath, content in stand_ins.items():
+            path = os.path.join(self.source, relpath)
+            if os.path.exists(path):
+                continue
+            if content is None:
+                with zipfile.ZipFile(path, 'w') as archive:
+                    archive.writestr('fonts/ttf/JetBrainsMono-Regular.ttf', b'\x00\x01\x00\x00harness')
+            else:
+                self.write(path, content)
+
+    def build(self):
+        self.stage_source()
+        for directory in ('etc', 'var/lib/dpkg', 'opt', 'usr/bin', 'usr/share/fonts', 'usr/share/backgrounds',
+                          'usr/share/gnome-shell/extensions', 'usr/share/desktop-base/kali-theme/grub',
+                          'boot/grub/themes/kali', 'root', 'tmp'):
+            os.makedirs(os.path.join(self.root, directory), exist_ok=True)
+        os.makedirs(self.home, exist_ok=True)
+        self.write(os.path.join(self.root, 'etc/debian_version'), "kali-rolling\n")
+        self.write(os.path.join(self.root, 'var/lib/dpkg/status'), DPKG_STATUS)
+
+        for name in LOGGING_STUBS:
+            self.write(os.path.join(self.bin, name), STUB.format(calls=self.calls, body='exit 0'), 0o755)
+        for name, body in STUB_BODIES.items():
+            self.write(os.path.join(self.bin, name), STUB.format(calls=self.calls, body=body), 0o755)
+
+        self.repo('fzf', {'install': ("#!/bin/sh\nexit 0\n", 0o755), 'README.md': ("fzf\n", None)})
+        self.repo('nvchad', {'init.lua': ("require 'nvchad'\n", None)})
+        self.repo('dash-to-panel', {'metadata.json': ('{"uuid": "dash-to-panel@jderose9.github.com"}\n', None)}, tag='v65')
+
+        nvim = io.BytesIO()
+        with tarfile.open(fileobj=nvim, mode='w:gz') as tar:
+            info = tarfile.TarInfo('nvim-linux-x86_64/bin/nvim')
+            body = b"#!/bin/sh\nexit 0\n"
+            info.size, info.mode = len(body), 0o755
+            tar.addfile(info, io.BytesIO(body))
+        self.write(os.path.join(self.remote, 'nvim-linux-x86_64.tar.gz'), nvim.getvalue())
+        self.write(os.path.join(self.remote, 'shasum.txt'),
+                   f"{hashlib.sha256(nvim.getvalue()).hexdigest()}  nvim-linux-x86_64.tar.gz\n")
+        with zipfile.ZipFile(os.path.join(self.remote, 'dash-to-panel.zip'), 'w') as archive:
+            archive.writestr('metadata.json', '{"uuid": "dash-to-panel@jderose9.github.com"}\n')
+
+    def serve(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), partial(Handler, directory=self.remote))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return {
+            'neovim': {'url': f"{base}/nvim-linux-x86_64.tar.gz", 'checksums': f"{base}/shasum.txt"},
+            'dash-to-panel': {'repo': os.path.join(self.remote, 'dash-to-panel.git'),
+                              'release': f"{base}/dash-to-panel.zip?tag={{tag}}"},
+            'fzf': {'repo': os.path.join(self.remote, 'fzf.git')},
+            'nvchad': {'repo': os.path.join(self.remote, 'nvchad.git')}
+        }
+
+    def environment(self):
+        return {
+            'DOTFILES_SYSROOT': self.root,
+            'DOTFILES_HOME': self.home,
+            'PATH': f"{self.bin}:{os.environ.get('PATH', '/usr/bin:/bin')}",
+            'USER': os.environ.get('USER') or 'root',
+            'DISPLAY': ':99',
+            'XDG_RUNTIME_DIR': os.path.join(self.path, 'run'),
+            'TMPDIR': os.path.join(self.root, 'tmp')
+        }
+
+    def tool_calls(self):
+        try:
+            with open(self.calls) as f:
+                return [(float(line.split('\t', 1)[0]), line.split('\t', 1)[1].strip()) for line in f if '\t' in line]
+        except OSError:
+            return []
+
+    def written_files(self, since):
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                try:
+                    stat = os.lstat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                if stat.st_ctime >= since:
+                    files.append((stat.st_ctime, stat.st_size))
+        return files
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+
+def attribute(windows, timestamp):
+    for name, start, end in windows:
+        if start <= timestamp <= end:
+            return name
+    return None
+
+def run_once(prefix, force):
+    started = time.time()
+    import install
+
+    installer = install.CombinedInstaller(force=force, assume_yes=True)
+    installer.REMOTE_ARTIFACTS = prefix.remote_artifacts
+    wall = time.perf_counter()
+    success = installer.run()
+    wall = time.perf_counter() - wall
+
+    stats = installer.tracer.task_stats()
+    windows = [(span['task'], span['start'], span['start'] + span['duration'])
+               for span in installer.tracer.spans if span['category'] == 'task']
+    for entry in stats.values():
+        entry['bytes_written'], entry['tool_calls'] = 0, 0
+    names = {span['name']: span['task'] for span in installer.tracer.spans if span['category'] == 'task'}
+    by_task = {task: stats[name] for name, task in names.items()}
+    for timestamp, size in prefix.written_files(started):
+        task = attribute(windows, timestamp)
+        if task in by_task:
+            by_task[task]['bytes_written'] += size
+    for timestamp, _ in prefix.tool_calls():
+        task = attribute(windows, timestamp)
+        if task in by_task:
+            by_task[task]['tool_calls'] += 1
+    return {'success': success, 'wall': wall, 'tasks': stats}
+
+def print_report(runs):
+    for i, run in enumerate(runs, 1):
+        print(f"\nRun {i}: {'ok' if run['success'] else 'FAILED'} in {run['wall']:.2f}s")
+        print(f"{'task':<45} {'status':<8} {'time':>8} {'procs':>6} {'tools':>6} {'written':>10}")
+        for name, entry in run['tasks'].items():
+            print(f"{name[:45]:<45} {str(entry['status']):<8} {entry['duration']:>7.2f}s {entry['subprocesses']:>6} "
+                  f"{entry['tool_calls']:>6} {entry['bytes_written'] // 1024:>7} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the full installer inside a throwaway fake root and report per-task cost")
+    parser.add_argument('--runs', type=int, default=2, help="installer runs against the same prefix (later runs measure the warm path)")
+    parser.add_argument('--force', action='store_true', help="pass --force to every run")
+    parser.add_argument('--keep', action='store_true', help="keep the fake root for inspection")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix='dotfiles-harness-')
+    prefix = FakeRoot(path)
+    try:
+        prefix.build()
+        prefix.remote_artifacts = prefix.serve()
+        os.environ.update(prefix.environment())
+        sys.path.insert(0, prefix.source)
+        runs = []
+        for _ in range(args.runs):
+            runs.append(run_once(prefix, args.force))
+        print_report(runs)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(runs, f, indent=2)
+        return 0 if all(run['success'] for run in runs) else 1
+    finally:
+        prefix.close()
+        if args.keep:
+            print(f"\nFake root kept at {path}")
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
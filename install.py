@@ -9,7 +9,12 @@ import os
 import json
 import subprocess
 import urllib.request
+import urllib.parse
+import http.client
 import zipfile
+import zlib
+import tarfile
+import ctypes
 import tempfile
 import sys
 import shutil
@@ -17,6 +22,30 @@ import time
 from pathlib import Path
 import logging
 import hashlib
+import base64
+import argparse
+import re
+import ast
+import threading
+import errno
+import fcntl
+import pwd
+import struct
+import select
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SYSROOT = os.environ.get('DOTFILES_SYSROOT', '/')
+
+def sysroot(path):
+    return path if SYSROOT == '/' else os.path.join(SYSROOT, path.lstrip('/'))
 
 # ------------------------------- Kali Style Class --------------------------- #
 
@@ -40,26 +69,1814 @@ class KaliStyle:
     INFO = f"{BLUE}{BOLD}[i]{RESET}"
     WARNING = f"{YELLOW}{BOLD}[!]{RESET}"
 
+# ------------------------------- Tracer Class --------------------------- #
+
+class Tracer:
+
+    def __init__(self):
+        self.spans = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.time()
+
+    @contextmanager
+    def span(self, name, category='task', **attrs):
+        stack = self.local.__dict__.setdefault('stack', [])
+        owner = name if category == 'task' else next((e['name'] for e in reversed(stack) if e['category'] == 'task'), None)
+        entry = dict(attrs, name=name, category=category, start=time.time(), duration=None, owner=owner,
+                     thread=threading.get_ident(), parent=stack[-1]['name'] if stack else None)
+        started = time.perf_counter()
+        stack.append(entry)
+        try:
+            yield entry
+        except BaseException as e:
+            entry.setdefault('error', repr(e))
+            raise
+        finally:
+            stack.pop()
+            entry['duration'] = time.perf_counter() - started
+            with self.lock:
+                self.spans.append(entry)
+
+    def run(self, argv, **kwargs):
+        command = argv if isinstance(argv, str) else ' '.join(str(arg) for arg in argv)
+        with self.span(command, 'subprocess') as entry:
+            try:
+                result = subprocess.run(argv, **kwargs)
+            except subprocess.CalledProcessError as e:
+                entry['exit_code'] = e.returncode
+                raise
+            entry['exit_code'] = result.returncode
+            return result
+
+    def stream(self, argv, log_path, **kwargs):
+        command = argv if isinstance(argv, str) else ' '.join(str(arg) for arg in argv)
+        with self.span(command, 'subprocess', log=log_path) as entry:
+            returncode, tail = OutputLog.run(argv, log_path, **kwargs)
+            entry['exit_code'] = returncode
+            return returncode, tail
+
+    def task_stats(self):
+        stats = {}
+        for span in self.spans:
+            if span['category'] == 'task':
+                stats.setdefault(span['name'], {'duration': 0.0, 'subprocesses': 0, 'bytes': 0, 'status': span.get('status')})
+                stats[span['name']]['duration'] += span['duration']
+        for span in self.spans:
+            owner = span['owner']
+            if owner in stats and span['category'] != 'task':
+                stats[owner]['subprocesses'] += span.get('processes', 1 if span['category'] == 'subprocess' else 0)
+                stats[owner]['bytes'] += span.get('bytes', 0)
+        return stats
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'origin': self.origin, 'spans': self.spans}, f, indent=2, default=str)
+
+    def export_chrome(self, path):
+        events = []
+        for span in self.spans:
+            args = {k: v for k, v in span.items() if k not in ('name', 'category', 'start', 'duration', 'thread')}
+            events.append({
+                'name': span['name'],
+                'cat': span['category'],
+                'ph': 'X',
+                'ts': int((span['start'] - self.origin) * 1e6),
+                'dur': int(span['duration'] * 1e6),
+                'pid': os.getpid(),
+                'tid': span['thread'],
+                'args': args
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def print_summary(self, limit=5):
+        stats = self.task_stats()
+        if not stats:
+            return
+        slowest = sorted(stats.items(), key=lambda item: item[1]['duration'], reverse=True)[:limit]
+        width = max(len(name) for name, _ in slowest)
+        print(f"\n{KaliStyle.INFO} Slowest tasks:")
+        print(f"   {KaliStyle.GREY}{'Task':<{width + 2}}  {'Time':>8}  {'Procs':>5}  {'Downloaded':>10}{KaliStyle.RESET}")
+        for name, stat in slowest:
+            downloaded = f"{stat['bytes'] / (1024 * 1024):.1f} MiB" if stat['bytes'] else '-'
+            print(f"   {KaliStyle.YELLOW}▸{KaliStyle.RESET} {name:<{width}}  {stat['duration']:>7.2f}s  {stat['subprocesses']:>5}  {downloaded:>10}")
+
+# ------------------------------- Output Log Class --------------------------- #
+
+class OutputLog:
+
+    MAX_BYTES = 1024 * 1024
+    BACKUPS = 3
+    TAIL_LINES = 40
+
+    @classmethod
+    def rotate(cls, path):
+        for index in range(cls.BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+
+    @classmethod
+    def run(cls, argv, log_path, input=None, cwd=None, shell=False):
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        tail = deque(maxlen=cls.TAIL_LINES)
+        log = open(log_path, 'ab')
+        try:
+            command = argv if isinstance(argv, str) else ' '.join(str(arg) for arg in argv)
+            log.write(f"$ {command}\n".encode())
+            log.flush()
+            process = subprocess.Popen(argv, shell=shell, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       stdin=subprocess.DEVNULL if input is None else subprocess.PIPE)
+            if input is not None:
+                def feed():
+                    with process.stdin:
+                        process.stdin.write(input.encode())
+                threading.Thread(target=feed, daemon=True).start()
+            for line in process.stdout:
+                if log.tell() + len(line) > cls.MAX_BYTES:
+                    log.close()
+                    cls.rotate(log_path)
+                    log = open(log_path, 'ab')
+                log.write(line)
+                log.flush()
+                tail.append(line.decode(errors='replace').rstrip('\n'))
+            returncode = process.wait()
+            log.write(f"[exit {returncode}]\n".encode())
+            return returncode, list(tail)
+        finally:
+            log.close()
+
+# ------------------------------- Progress Renderer Class --------------------------- #
+
+class ProgressRenderer:
+
+    FPS = 10
+
+    def __init__(self, title, rows, stream=None):
+        self.title = title
+        self.rows = list(rows)
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty() and os.environ.get('TERM') != 'dumb'
+        self.width = max((len(row) for row in self.rows), default=0)
+        self.drawn = {row: ('Pending', KaliStyle.GREY) for row in self.rows}
+        self.events = queue.SimpleQueue()
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def update(self, row, state, color=''):
+        self.events.put((row, state, color))
+
+    def stop(self):
+        if self.thread:
+            self.events.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def line(self, row, state, color):
+        if not self.tty:
+            return f"  - {row:<{self.width}} {state}"
+        return f"  {KaliStyle.YELLOW}•{KaliStyle.RESET} {row:<{self.width}} {color}{state}{KaliStyle.RESET}"
+
+    def draw(self, pending):
+        output = []
+        for row, (state, color) in pending.items():
+            if self.drawn.get(row) == (state, color):
+                continue
+            self.drawn[row] = (state, color)
+            if self.tty:
+                up = len(self.rows) - self.rows.index(row)
+                output.append(f"\033[{up}A\r\033[K{self.line(row, state, color)}\033[{up}B\r")
+            else:
+                output.append(f"{self.line(row, state, color)}\n")
+        if output:
+            self.stream.write(''.join(output))
+            self.stream.flush()
+
+    def loop(self):
+        header = f"{KaliStyle.INFO} {self.title}:\n" if self.tty else f"[i] {self.title}:\n"
+        if self.tty:
+            header += ''.join(f"{self.line(row, *self.drawn[row])}\n" for row in self.rows)
+        self.stream.write(header)
+        self.stream.flush()
+        interval, last, pending = 1 / self.FPS, 0.0, {}
+        while True:
+            timeout = max(0.0, last + interval - time.monotonic()) if pending else None
+            try:
+                event = self.events.get(timeout=timeout)
+            except queue.Empty:
+                event = ()
+            if event is None:
+                self.draw(pending)
+                return
+            if event:
+                pending[event[0]] = event[1:]
+                if not self.tty:
+                    self.draw(pending)
+                    pending = {}
+                    continue
+            if pending and time.monotonic() >= last + interval:
+                self.draw(pending)
+                pending, last = {}, time.monotonic()
+
+# ------------------------------- State Manifest Class --------------------------- #
+
+class StateManifest:
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {'version': self.VERSION, 'tasks': {}, 'settings': {}, 'files': {}, 'trees': {}}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == self.VERSION:
+            self.data.update(data)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def file_digest(self, path):
+        st = os.stat(path)
+        cached = self.data['files'].get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        self.data['files'][path] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def walk(self, path):
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif os.path.exists(path):
+            yield path
+
+    def fingerprint(self, inputs=(), outputs=(), params=None):
+        digest = hashlib.sha256()
+        for path in inputs:
+            digest.update(f"input:{path}\n".encode())
+            for file_path in self.walk(path):
+                digest.update(f"{file_path}:{self.file_digest(file_path)}\n".encode())
+        for path in outputs:
+            digest.update(f"output:{path}:{os.path.lexists(path)}\n".encode())
+        digest.update(json.dumps(params or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def is_current(self, name, fingerprint):
+        entry = self.data['tasks'].get(name)
+        return bool(entry) and entry.get('status') == 'done' and entry.get('fingerprint') == fingerprint
+
+    def mark_done(self, name, fingerprint):
+        self.data['tasks'][name] = {'status': 'done', 'fingerprint': fingerprint, 'time': time.time()}
+        self.save()
+
+    def mark_failed(self, name):
+        self.data['tasks'][name] = {'status': 'failed', 'fingerprint': None, 'time': time.time()}
+        self.save()
+
+# ------------------------------- Action Journal Class --------------------------- #
+
+class ActionJournal:
+
+    def __init__(self, path):
+        self.path = path
+        self.actions = []
+        self.task = None
+        self.file = None
+        self.lock = threading.Lock()
+
+    def pending(self):
+        entries, ended = [], set()
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry['type'] == 'end':
+                        ended.add(entry['task'])
+                    else:
+                        entries.append(entry)
+        except OSError:
+            return []
+        return [entry for entry in entries if entry['task'] not in ended]
+
+    def append(self, entry):
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                os.makedirs(directory, exist_ok=True)
+                self.file = open(self.path, 'a')
+                dir_fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def begin(self, task):
+        self.task = task
+
+    def record(self, action):
+        action = dict(action, task=self.task)
+        self.actions.append(action)
+        self.append(action)
+
+    def end(self, status='done'):
+        self.append({'type': 'end', 'task': self.task, 'status': status})
+        self.task = None
+
+    def reset(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self.actions = []
+        self.task = None
+
+# ------------------------------- Preflight Class --------------------------- #
+
+class Preflight:
+
+    TTL = 300
+    DPKG_STATUS = sysroot('/var/lib/dpkg/status')
+
+    def __init__(self, cache_path, ttl=TTL, runner=subprocess.run):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.runner = runner
+        self._index = None
+
+    def path_index(self):
+        if self._index is None:
+            index = {}
+            for directory in os.environ.get('PATH', os.defpath).split(os.pathsep):
+                try:
+                    with os.scandir(directory or '.') as entries:
+                        for entry in entries:
+                            index.setdefault(entry.name, []).append(entry.path)
+                except OSError:
+                    continue
+            self._index = index
+        return self._index
+
+    def invalidate(self):
+        self._index = None
+
+    def which(self, command):
+        for path in self.path_index().get(command, ()):
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
+        return None
+
+    def package_versions(self, packages):
+        wanted, versions = set(packages), {}
+        try:
+            with open(self.DPKG_STATUS) as f:
+                name, fields = None, None
+                for line in f:
+                    if line.startswith('Package: '):
+                        name = line[9:].strip()
+                        fields = {} if name in wanted else None
+                    elif fields is not None:
+                        if line == '\n':
+                            if fields.get('Status', '').endswith(' installed'):
+                                versions[name] = fields.get('Version')
+                            fields = None
+                        elif ':' in line and not line[0].isspace():
+                            key, _, value = line.partition(':')
+                            fields[key] = value.strip()
+                if fields and fields.get('Status', '').endswith(' installed'):
+                    versions[name] = fields.get('Version')
+        except OSError:
+            pass
+        return versions
+
+    def package_version(self, package):
+        return self.package_versions([package]).get(package)
+
+    def gnome_major(self):
+        version = self.package_version('gnome-shell')
+        if version is None and self.which('gnome-shell'):
+            result = self.runner(['gnome-shell', '--version'], capture_output=True, text=True)
+            version = result.stdout.strip().split()[-1] if result.stdout.strip() else None
+        match = re.match(r'(?:\d+:)?(\d+)', version or '')
+        return int(match.group(1)) if match else None
+
+    def cache_key(self, commands):
+        try:
+            dpkg_mtime = os.stat(self.DPKG_STATUS).st_mtime_ns
+        except OSError:
+            dpkg_mtime = None
+        return hashlib.sha256(json.dumps([os.environ.get('PATH'), dpkg_mtime, sorted(commands)]).encode()).hexdigest()
+
+    def probe(self, commands):
+        key = self.cache_key(commands)
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            if cached['key'] == key and time.time() - cached['time'] < self.ttl:
+                return cached['results']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            gnome_major = pool.submit(self.gnome_major)
+            pool.submit(self.path_index).result()
+        results = {'commands': {command: self.which(command) for command in commands}, 'gnome_major': gnome_major.result()}
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'key': key, 'time': time.time(), 'results': results}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.error(f"Could not cache preflight results: {str(e)}")
+        return results
+
+# ------------------------------- Settings Batch Class --------------------------- #
+
+class SettingsBatch:
+
+    def __init__(self, dconf='dconf', gsettings='gsettings', runner=subprocess.run):
+        self.dconf = dconf
+        self.gsettings = gsettings
+        self.runner = runner
+        self.sections = {}
+        self.extensions = None
+
+    @classmethod
+    def variant(cls, value):
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, (int, float)):
+            return str(value)
+        if isinstance(value, (list, tuple)):
+            return f"[{', '.join(cls.variant(v) for v in value)}]" if value else '@as []'
+        escaped = str(value).replace('\\', '\\\\').replace("'", "\\'")
+        return f"'{escaped}'"
+
+    @staticmethod
+    def schema_path(schema):
+        if ':' in schema:
+            return schema.split(':', 1)[1]
+        return f"/{schema.replace('.', '/')}/"
+
+    def set(self, schema, key, value):
+        self.set_raw(self.schema_path(schema), key, self.variant(value))
+
+    def set_raw(self, path, key, variant):
+        section = path.strip('/')
+        self.sections.setdefault(section, {})[key] = variant
+
+    def load(self, path, keyfile):
+        section = None
+        for line in keyfile.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                name = line[1:-1].strip('/')
+                section = f"{path.rstrip('/')}/{name}" if name else path
+                continue
+            if section is not None and '=' in line:
+                key, value = line.split('=', 1)
+                self.set_raw(section, key.strip(), value.strip())
+
+    def load_extension_state(self):
+        if self.extensions is not None:
+            return self.extensions
+        self.extensions = {'enabled-extensions': [], 'disabled-extensions': []}
+        try:
+            result = self.runner([self.gsettings, 'list-recursively', 'org.gnome.shell'],
+                                    capture_output=True, text=True, check=True)
+            for line in result.stdout.splitlines():
+                parts = line.split(' ', 2)
+                if len(parts) == 3 and parts[1] in self.extensions:
+                    self.extensions[parts[1]] = list(ast.literal_eval(parts[2].replace('@as ', '')))
+        except (OSError, subprocess.CalledProcessError, ValueError, SyntaxError) as e:
+            logging.error(f"Error reading enabled extensions: {str(e)}")
+        return self.extensions
+
+    def set_extension(self, uuid, enabled):
+        state = self.load_extension_state()
+        add, remove = ('enabled-extensions', 'disabled-extensions') if enabled else ('disabled-extensions', 'enabled-extensions')
+        if uuid in state[remove]:
+            state[remove].remove(uuid)
+        if uuid not in state[add]:
+            state[add].append(uuid)
+        for key in (add, remove):
+            self.set('org.gnome.shell', key, state[key])
+
+    def keyfile(self):
+        lines = []
+        for section, values in self.sections.items():
+            lines.append(f"[{section or '/'}]")
+            lines.extend(f"{key}={value}" for key, value in values.items())
+            lines.append('')
+        return '\n'.join(lines)
+
+    def apply(self):
+        if not self.sections:
+            return True
+        keyfile = self.keyfile()
+        try:
+            self.runner([self.dconf, 'load', '/'], input=keyfile, text=True, check=True,
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return True
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.error(f"Error applying settings batch: {str(e)}\nKeyfile:\n{keyfile}")
+            self.extensions = None
+            return False
+        finally:
+            self.sections = {}
+
+# ------------------------------- Downloader Class --------------------------- #
+
+class DownloadError(Exception):
+    pass
+
+class Downloader:
+
+    PIECE_SIZE = 4 * 1024 * 1024
+    READ_SIZE = 256 * 1024
+    MAX_REDIRECTS = 5
+
+    def __init__(self, connections=4, timeout=30, retries=3):
+        self.connections = connections
+        self.timeout = timeout
+        self.retries = retries
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = []
+
+    def open_connection(self, parts):
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        proxy = urllib.request.getproxies().get(parts.scheme)
+        if not proxy or urllib.request.proxy_bypass(parts.hostname or ''):
+            return connection_class(parts.netloc, timeout=self.timeout), False, {}
+        proxy = urllib.parse.urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+        headers = {}
+        if proxy.username:
+            credentials = f"{urllib.parse.unquote(proxy.username)}:{urllib.parse.unquote(proxy.password or '')}"
+            headers['Proxy-Authorization'] = f"Basic {base64.b64encode(credentials.encode()).decode()}"
+        if parts.scheme == 'https':
+            connection = connection_class(proxy.hostname, proxy.port or 80, timeout=self.timeout)
+            connection.set_tunnel(parts.hostname, parts.port, headers=headers)
+            return connection, False, {}
+        return connection_class(proxy.hostname, proxy.port or 80, timeout=self.timeout), True, headers
+
+    def connection(self, url):
+        parts = urllib.parse.urlsplit(url)
+        pool = self.local.__dict__.setdefault('pool', {})
+        key = (parts.scheme, parts.netloc)
+        if key not in pool:
+            pool[key] = self.open_connection(parts)
+            with self.lock:
+                self.opened.append(pool[key][0])
+        connection, absolute, headers = pool[key]
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        return connection, f"{parts.scheme}://{parts.netloc}{path}" if absolute else path, headers
+
+    def drop(self, url):
+        parts = urllib.parse.urlsplit(url)
+        entry = self.local.__dict__.get('pool', {}).pop((parts.scheme, parts.netloc), None)
+        if entry:
+            entry[0].close()
+
+    def close(self):
+        with self.lock:
+            opened, self.opened = self.opened, []
+        for connection in opened:
+            connection.close()
+
+    def request(self, url, headers=None):
+        for _ in range(self.MAX_REDIRECTS + 1):
+            connection, path, proxy_headers = self.connection(url)
+            try:
+                connection.request('GET', path, headers=dict(headers or {}, **proxy_headers, **{'User-Agent': 'dotfiles-gnome'}))
+                response = connection.getresponse()
+            except (OSError, http.client.HTTPException):
+                self.drop(url)
+                raise
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                continue
+            return url, response
+        raise DownloadError(f"Too many redirects for {url}")
+
+    def retrying(self, url, action):
+        error = None
+        for attempt in range(self.retries):
+            try:
+                return action()
+            except (OSError, http.client.HTTPException, DownloadError) as e:
+                self.drop(url)
+                error = e
+                time.sleep(min(2 ** attempt, 5))
+        raise DownloadError(f"{url}: {error}")
+
+    def read(self, url):
+        def attempt():
+            _, response = self.request(url)
+            body = response.read()
+            if response.status != 200:
+                raise DownloadError(f"HTTP {response.status}")
+            return body
+        return self.retrying(url, attempt)
+
+    def probe(self, url):
+        final_url, response = self.request(url, {'Range': 'bytes=0-0'})
+        validator = response.getheader('ETag') or response.getheader('Last-Modified')
+        total = (response.getheader('Content-Range') or '').rpartition('/')[2]
+        if response.status == 206 and total.isdigit():
+            response.read()
+            return final_url, int(total), validator, None
+        if response.status == 200:
+            length = response.getheader('Content-Length')
+            return final_url, int(length) if length else None, validator, response
+        response.read()
+        raise DownloadError(f"HTTP {response.status}")
+
+    @staticmethod
+    def load_state(state_path, part, url, size, validator):
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+            if (state['url'], state['size'], state['validator']) == (url, size, validator) and os.path.getsize(part) == size:
+                return set(state['done'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    @staticmethod
+    def save_state(state_path, url, size, validator, done):
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'url': url, 'size': size, 'validator': validator, 'done': sorted(done)}, f)
+        os.replace(tmp_path, state_path)
+
+    def fetch_piece(self, url, fd, offset, length):
+        position = offset
+        def attempt():
+            nonlocal position
+            end = offset + length - 1
+            _, response = self.request(url, {'Range': f"bytes={position}-{end}"})
+            if response.status != 206:
+                response.read()
+                raise DownloadError(f"range request returned HTTP {response.status}")
+            while position <= end:
+                data = response.read(min(self.READ_SIZE, end - position + 1))
+                if not data:
+                    raise DownloadError(f"connection closed at byte {position}")
+                os.pwrite(fd, data, position)
+                position += len(data)
+            return length
+        return self.retrying(url, attempt)
+
+    def fetch_ranges(self, url, final_url, part, state_path, size, validator):
+        done = self.load_state(state_path, part, url, size, validator)
+        resumed = bool(done)
+        if done is None:
+            done = set()
+            with open(part, 'wb') as f:
+                f.truncate(size)
+        pieces = [(offset, min(self.PIECE_SIZE, size - offset)) for offset in range(0, size, self.PIECE_SIZE) if offset not in done]
+        fd = os.open(part, os.O_WRONLY)
+        try:
+            def fetch(piece):
+                self.fetch_piece(final_url, fd, *piece)
+                os.fdatasync(fd)
+                with self.lock:
+                    done.add(piece[0])
+                    self.save_state(state_path, url, size, validator, done)
+                return piece[1]
+            with ThreadPoolExecutor(max_workers=max(1, min(self.connections, len(pieces)))) as executor:
+                fetched = sum(executor.map(fetch, pieces))
+        finally:
+            os.close(fd)
+        return fetched, resumed
+
+    def fetch_stream(self, url, part, response=None):
+        def attempt():
+            body = response if response is not None else self.request(url)[1]
+            if body.status != 200:
+                body.read()
+                raise DownloadError(f"HTTP {body.status}")
+            with open(part, 'wb') as f:
+                shutil.copyfileobj(body, f, self.READ_SIZE)
+                return f.tell()
+        try:
+            return attempt()
+        except (OSError, http.client.HTTPException, DownloadError):
+            if response is None:
+                raise
+            self.drop(url)
+            response = None
+            return self.retrying(url, attempt)
+
+    def fetch(self, url, dest, sha256=None):
+        if sha256 and os.path.exists(dest) and AssetDeployer.digest(dest) == sha256:
+            return {'path': dest, 'bytes': 0, 'sha256': sha256, 'resumed': False, 'cached': True}
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        part, state_path = f"{dest}.part", f"{dest}.part.json"
+        final_url, size, validator, response = self.retrying(url, lambda: self.probe(url))
+        if response is None:
+            fetched, resumed = self.fetch_ranges(url, final_url, part, state_path, size, validator)
+        else:
+            fetched, resumed = self.fetch_stream(final_url, part, response), False
+            if size is not None and fetched != size:
+                raise DownloadError(f"Truncated download of {url}: got {fetched} of {size} bytes")
+        digest = AssetDeployer.digest(part)
+        if sha256 and digest != sha256:
+            for path in (part, state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise DownloadError(f"Checksum mismatch for {url}: {digest} != {sha256}")
+        os.replace(part, dest)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return {'path': dest, 'bytes': fetched, 'sha256': digest, 'resumed': resumed, 'cached': False}
+
+# ------------------------------- Asset Deployer Class --------------------------- #
+
+class HashingReader:
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.sha256.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def drain(self):
+        while self.read(1024 * 1024):
+            pass
+
+
+class AssetDeployer:
+
+    FICLONE = 0x40049409
+
+    @staticmethod
+    def digest(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def identical(cls, src, dest):
+        try:
+            if os.path.islink(dest) or os.path.getsize(src) != os.path.getsize(dest):
+                return False
+            return os.path.samefile(src, dest) or cls.digest(src) == cls.digest(dest)
+        except OSError:
+            return False
+
+    @classmethod
+    def copy_data(cls, src, dest):
+        with open(src, 'rb') as fsrc, open(dest, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), cls.FICLONE, fsrc.fileno())
+                return 'reflink'
+            except OSError:
+                pass
+            size = os.fstat(fsrc.fileno()).st_size
+            for method in ('copy_file_range', 'sendfile'):
+                try:
+                    copied = 0
+                    while copied < size:
+                        if method == 'copy_file_range':
+                            sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied, copied, copied)
+                        else:
+                            sent = os.sendfile(fdst.fileno(), fsrc.fileno(), copied, size - copied)
+                        if sent == 0:
+                            break
+                        copied += sent
+                    if copied == size:
+                        return method
+                except (OSError, AttributeError) as e:
+                    if isinstance(e, OSError) and e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                        raise
+                fdst.seek(0)
+                fdst.truncate()
+            fsrc.seek(0)
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+            return 'copy'
+
+    @staticmethod
+    def snapshot(path, backup):
+        tmp_path = f"{backup}.tmp-{os.getpid()}"
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, backup)
+
+    @classmethod
+    def deploy(cls, src, dest, mode=0o644, backup=None, link_from=None):
+        existed = os.path.lexists(dest)
+        if existed and cls.identical(src, dest):
+            if mode is not None and os.stat(dest).st_mode & 0o7777 != mode:
+                os.chmod(dest, mode)
+            return {'changed': False, 'dest': dest, 'backup': None, 'method': None}
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if backup and existed:
+            cls.snapshot(dest, backup)
+        tmp_path = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.tmp-{os.getpid()}")
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        method = None
+        if link_from and cls.identical(src, link_from):
+            try:
+                os.link(link_from, tmp_path)
+                method = 'hardlink'
+            except OSError:
+                pass
+        try:
+            if method is None:
+                method = cls.copy_data(src, tmp_path)
+                shutil.copystat(src, tmp_path)
+            if mode is not None:
+                os.chmod(tmp_path, mode)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {'changed': True, 'dest': dest, 'backup': backup if backup and existed else None, 'method': method}
+
+    @staticmethod
+    def file_crc32(path):
+        crc = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+    @classmethod
+    def extract_zip(cls, archive, dest_dir, mode=0o644):
+        changed = []
+        unchanged = 0
+        dest_root = os.path.realpath(dest_dir)
+        with zipfile.ZipFile(archive) as zf:
+            for member in zf.infolist():
+                if member.is_dir():
+                    continue
+                dest = os.path.realpath(os.path.join(dest_root, member.filename))
+                if not dest.startswith(dest_root + os.sep):
+                    raise ValueError(f"Unsafe path in archive: {member.filename}")
+                mtime = time.mktime(member.date_time + (0, 0, -1))
+                if os.path.isfile(dest) and os.path.getsize(dest) == member.file_size:
+                    if int(os.path.getmtime(dest)) == int(mtime):
+                        unchanged += 1
+                        continue
+                    if cls.file_crc32(dest) == member.CRC:
+                        os.utime(dest, (mtime, mtime))
+                        unchanged += 1
+                        continue
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                tmp_path = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.tmp-{os.getpid()}")
+                with zf.open(member) as fsrc, open(tmp_path, 'wb') as fdst:
+                    shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+                os.chmod(tmp_path, mode)
+                os.utime(tmp_path, (mtime, mtime))
+                os.replace(tmp_path, dest)
+                changed.append(dest)
+        return {'changed': changed, 'unchanged': unchanged}
+
+    @staticmethod
+    def exchange(path, other):
+        libc = ctypes.CDLL(None, use_errno=True)
+        renameat2 = getattr(libc, 'renameat2', None)
+        if renameat2 is not None:
+            AT_FDCWD, RENAME_EXCHANGE = -100, 2
+            if renameat2(AT_FDCWD, os.fsencode(path), AT_FDCWD, os.fsencode(other), RENAME_EXCHANGE) == 0:
+                return
+        old_path = f"{other}.old-{os.getpid()}"
+        os.rename(other, old_path)
+        os.rename(path, other)
+        os.rename(old_path, path)
+
+    @classmethod
+    def install_tarball(cls, source, parent_dir, sha256=None, required=None, member=None):
+        staging = os.path.join(parent_dir, f".install-{os.getpid()}-{int(time.time())}")
+        os.makedirs(staging)
+        bundle = None
+        try:
+            if member:
+                bundle = zipfile.ZipFile(source)
+                stream = bundle.open(member)
+                expected_size = bundle.getinfo(member).file_size
+            else:
+                stream = open(source, 'rb')
+                expected_size = os.path.getsize(source)
+            with stream:
+                reader = HashingReader(stream)
+                with tarfile.open(fileobj=reader, mode='r|gz') as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extraction_filter = tarfile.data_filter
+                    tar.extractall(staging)
+                reader.drain()
+            if reader.bytes_read != expected_size:
+                raise ValueError(f"Truncated archive: got {reader.bytes_read} of {expected_size} bytes")
+            if sha256 and reader.sha256.hexdigest() != sha256:
+                raise ValueError(f"Checksum mismatch for {source}: {reader.sha256.hexdigest()} != {sha256}")
+            entries = os.listdir(staging)
+            if len(entries) != 1 or not os.path.isdir(os.path.join(staging, entries[0])):
+                raise ValueError(f"Expected a single top-level directory in {source}, found {entries}")
+            staged = os.path.join(staging, entries[0])
+            if required and not os.path.exists(os.path.join(staged, required)):
+                raise ValueError(f"{required} missing from {source}")
+            dest = os.path.join(parent_dir, entries[0])
+            if os.path.lexists(dest):
+                cls.exchange(staged, dest)
+            else:
+                os.rename(staged, dest)
+            return {'dest': dest, 'bytes': reader.bytes_read, 'sha256': reader.sha256.hexdigest()}
+        finally:
+            if bundle:
+                bundle.close()
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @classmethod
+    def sync_tree(cls, src_dir, dest_dir, previous=None):
+        previous = previous or {}
+        manifest, copied, created, removed, unchanged = {}, [], [], [], 0
+        for root, dirs, files in os.walk(src_dir):
+            dirs.sort()
+            for name in sorted(files):
+                src = os.path.join(root, name)
+                relpath = os.path.relpath(src, src_dir)
+                dest = os.path.join(dest_dir, relpath)
+                src_stat = os.stat(src)
+                try:
+                    dest_stat = os.stat(dest)
+                except FileNotFoundError:
+                    dest_stat = None
+                known = previous.get(relpath)
+                if (known and dest_stat and dest_stat.st_size == src_stat.st_size
+                        and known == [src_stat.st_size, src_stat.st_mtime_ns, dest_stat.st_mtime_ns]):
+                    manifest[relpath] = known
+                    unchanged += 1
+                    continue
+                result = cls.deploy(src, dest, src_stat.st_mode & 0o7777)
+                if result['changed']:
+                    copied.append(relpath)
+                    if dest_stat is None:
+                        created.append(relpath)
+                else:
+                    unchanged += 1
+                manifest[relpath] = [src_stat.st_size, src_stat.st_mtime_ns, os.stat(dest).st_mtime_ns]
+
+        for relpath in sorted(set(previous) - set(manifest)):
+            path = os.path.join(dest_dir, relpath)
+            if os.path.lexists(path) and not os.path.isdir(path):
+                os.remove(path)
+                removed.append(relpath)
+            parent = os.path.dirname(path)
+            while parent != dest_dir and parent.startswith(dest_dir + os.sep):
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+        return {'copied': copied, 'created': created, 'removed': removed, 'unchanged': unchanged, 'manifest': manifest}
+
+    @classmethod
+    def deploy_many(cls, src, dests, mode=0o644, backup_suffix=None):
+        results = []
+        linked = {}
+        for dest in dests:
+            backup = f"{dest}{backup_suffix}" if backup_suffix else None
+            device = os.stat(os.path.dirname(dest)).st_dev if os.path.isdir(os.path.dirname(dest)) else None
+            result = cls.deploy(src, dest, mode, backup, link_from=linked.get(device))
+            linked.setdefault(device, dest)
+            results.append(result)
+        return results
+
+
+# ------------------------------- Zsh Startup Class --------------------------- #
+
+class ZshStartup:
+
+    AUTOLOAD = ('updateAndClean', 'dockerClean', 'mkt', 'rmk', 'setup_target')
+    FUNCTIONS_DIR = '.config/zsh/functions'
+    SUDO_PLUGIN = sysroot('/usr/share/sudo-plugin/sudo.plugin.zsh')
+    BEGIN = '# >>> dotfiles-gnome autoload >>>'
+    END = '# <<< dotfiles-gnome autoload <<<'
+
+    @classmethod
+    def rewrite(cls, content, functions_dir, existing=()):
+        content = re.sub(rf"{re.escape(cls.BEGIN)}.*?{re.escape(cls.END)}\n?", '', content, flags=re.S)
+        header = re.compile(r'^(\s*)(?:function\s+)?([\w-]+)\s*\(\)\s*\{\s*$')
+        lines = content.splitlines(keepends=True)
+        output, functions, i = [], {}, 0
+        while i < len(lines):
+            match = header.match(lines[i])
+            if match and match.group(2) in cls.AUTOLOAD:
+                closing = f"{match.group(1)}}}"
+                end = next((j for j in range(i + 1, len(lines)) if lines[j].rstrip() == closing), None)
+                if end is not None:
+                    functions[match.group(2)] = ''.join(lines[i + 1:end])
+                    i = end + 1
+                    continue
+            output.append(lines[i])
+            i += 1
+
+        names = sorted(set(functions) | set(name for name in existing if name in cls.AUTOLOAD))
+        if names:
+            block = f"{cls.BEGIN}\nfpath=({functions_dir} $fpath)\nautoload -Uz {' '.join(names)}\n{cls.END}\n"
+            position = next((k + 1 for k, line in enumerate(output) if line.startswith('compinit')), 0)
+            output.insert(position, block)
+        return ''.join(output), functions
+
+    @staticmethod
+    def compile_command(*paths, functions_dir=None):
+        script = 'd=$1; shift; for f in "$@"; do zcompile -R "$f" || exit 1; done; [[ -z $d ]] || zcompile -U "$d.zwc" "$d"/*'
+        return ['zsh', '-fc', script, 'zsh', functions_dir or ''] + list(paths)
+
+    @staticmethod
+    def benchmark(runs=10, shell='zsh'):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([shell, '-i', '-c', 'exit'], stdin=subprocess.DEVNULL,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        return {'runs': runs, 'min': timings[0], 'median': timings[len(timings) // 2],
+                'mean': sum(timings) / len(timings)}
+
+# ------------------------------- Image Optimizer Class --------------------------- #
+
+class ImageOptimizer:
+
+    VERSION = 1
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    DROPPED_CHUNKS = (b'tEXt', b'zTXt', b'iTXt', b'tIME')
+
+    def __init__(self, cache_dir, prescale=False, runner=subprocess.run):
+        self.cache_dir = cache_dir
+        self.prescale = prescale
+        self.runner = runner
+
+    @staticmethod
+    def display_resolution(drm_dir='/sys/class/drm'):
+        best = None
+        try:
+            connectors = sorted(os.listdir(drm_dir))
+        except OSError:
+            return None
+        for name in connectors:
+            try:
+                with open(os.path.join(drm_dir, name, 'status')) as f:
+                    if f.read().strip() != 'connected':
+                        continue
+                with open(os.path.join(drm_dir, name, 'modes')) as f:
+                    mode = f.readline().strip()
+            except OSError:
+                continue
+            match = re.match(r'(\d+)x(\d+)', mode)
+            if match:
+                size = (int(match.group(1)), int(match.group(2)))
+                if best is None or size[0] * size[1] > best[0] * best[1]:
+                    best = size
+        return best
+
+    @classmethod
+    def chunks(cls, data):
+        if not data.startswith(cls.PNG_SIGNATURE):
+            raise ValueError("Not a PNG file")
+        offset = len(cls.PNG_SIGNATURE)
+        while offset < len(data):
+            length, kind = struct.unpack('>I4s', data[offset:offset + 8])
+            yield kind, data[offset + 8:offset + 8 + length]
+            offset += length + 12
+
+    @staticmethod
+    def chunk(kind, body):
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+    @classmethod
+    def recompress(cls, data):
+        chunks = list(cls.chunks(data))
+        pixels = zlib.decompress(b''.join(body for kind, body in chunks if kind == b'IDAT'))
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9)
+        packed = compressor.compress(pixels) + compressor.flush()
+        output = [cls.PNG_SIGNATURE]
+        for kind, body in chunks:
+            if kind == b'IDAT':
+                if packed is not None:
+                    output.append(cls.chunk(b'IDAT', packed))
+                    packed = None
+            elif kind not in cls.DROPPED_CHUNKS:
+                output.append(cls.chunk(kind, body))
+        return b''.join(output)
+
+    def external(self, src, dest):
+        for tool, argv in (('oxipng', ['oxipng', '-q', '-o', '4', '--strip', 'safe', '--out', dest, src]),
+                           ('optipng', ['optipng', '-quiet', '-o2', '-out', dest, src])):
+            if shutil.which(tool):
+                result = self.runner(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                if result.returncode == 0 and os.path.exists(dest):
+                    return tool
+        return None
+
+    @staticmethod
+    def scale(src, dest, resolution):
+        with Image.open(src) as image:
+            factor = max(resolution[0] / image.width, resolution[1] / image.height)
+            if factor >= 1:
+                return False
+            size = (round(image.width * factor), round(image.height * factor))
+            image.resize(size, Image.LANCZOS).save(dest, format='PNG')
+        return True
+
+    def optimize(self, src):
+        if not src.lower().endswith('.png'):
+            return src, None
+        resolution = self.display_resolution() if self.prescale and Image is not None else None
+        with open(src, 'rb') as f:
+            data = f.read()
+        key = hashlib.sha256(data + json.dumps([self.VERSION, resolution]).encode()).hexdigest()
+        cached = os.path.join(self.cache_dir, f"{key}.png")
+        if os.path.exists(cached):
+            return cached, 'cache'
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{cached}.tmp-{os.getpid()}"
+        scaled_path = f"{cached}.scaled-{os.getpid()}"
+        source = scaled_path if resolution and self.scale(src, scaled_path, resolution) else src
+        try:
+            method = self.external(source, tmp_path)
+            if method is None:
+                with open(source, 'rb') as f:
+                    packed = self.recompress(f.read())
+                with open(tmp_path, 'wb') as f:
+                    f.write(packed)
+                method = 'zlib'
+            if os.path.getsize(tmp_path) >= os.path.getsize(source):
+                shutil.copyfile(source, tmp_path)
+                method = 'original'
+            if source == scaled_path:
+                method = f"scaled {resolution[0]}x{resolution[1]}, {method}"
+            os.replace(tmp_path, cached)
+        finally:
+            for path in (tmp_path, scaled_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        return cached, method
+
+# ------------------------------- Install Verifier Class --------------------------- #
+
+class DigestCache:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key(path):
+        stat = os.stat(path)
+        return [stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns]
+
+    def cached(self, name, key, compute):
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry and entry[:-1] == key:
+            return entry[-1]
+        digest = compute()
+        with self.lock:
+            self.entries[name] = key + [digest]
+            self.dirty = True
+        return digest
+
+    def digest(self, path):
+        return self.cached(path, self.key(path), lambda: AssetDeployer.digest(path))
+
+    def member_digest(self, archive, member):
+        def compute():
+            digest = hashlib.sha256()
+            with zipfile.ZipFile(archive) as zf, zf.open(member) as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        return self.cached(f"{archive}!{member}", self.key(archive), compute)
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.entries = {name: entry for name, entry in self.entries.items() if os.path.exists(name.split('!', 1)[0])}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+class InstallVerifier:
+
+    def __init__(self, cache, workers=None):
+        self.cache = cache
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 2)
+
+    @staticmethod
+    def extras(dest_dir, expected):
+        found = []
+        for root, _, names in os.walk(dest_dir):
+            found += [path for path in (os.path.join(root, name) for name in names) if path not in expected]
+        return found
+
+    def plan(self, files=(), trees=(), archives=()):
+        checks, extras = list(files), []
+        for src_dir, dest_dir, exact in trees:
+            expected = set()
+            for root, dirs, names in os.walk(src_dir):
+                dirs[:] = [d for d in dirs if d not in ('.git', '__pycache__')]
+                for name in names:
+                    src = os.path.join(root, name)
+                    dest = os.path.join(dest_dir, os.path.relpath(src, src_dir))
+                    checks.append((src, dest))
+                    expected.add(dest)
+            if exact:
+                extras += self.extras(dest_dir, expected)
+        for archive, dest_dir in archives:
+            with zipfile.ZipFile(archive) as zf:
+                checks += [((archive, member.filename), os.path.join(dest_dir, member.filename))
+                           for member in zf.infolist() if not member.is_dir()]
+        return checks, extras
+
+    def check(self, source, dest):
+        result = {'path': dest, 'source': '!'.join(source) if isinstance(source, tuple) else source}
+        try:
+            actual = self.cache.digest(dest)
+        except FileNotFoundError:
+            return dict(result, status='missing')
+        except OSError:
+            return dict(result, status='unreadable')
+        try:
+            expected = self.cache.member_digest(*source) if isinstance(source, tuple) else self.cache.digest(source)
+        except OSError:
+            return dict(result, status='no source')
+        return dict(result, status='ok' if actual == expected else 'modified')
+
+    def verify(self, files=(), trees=(), archives=()):
+        checks, extras = self.plan(files, trees, archives)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda check: self.check(*check), checks))
+        results += [{'path': path, 'source': None, 'status': 'extra'} for path in extras]
+        self.cache.save()
+        return results
+
+# ------------------------------- Asset Watcher Class --------------------------- #
+
+class AssetWatcher:
+
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct('iIII')
+    DEBOUNCE = 0.15
+    IGNORED_SUFFIXES = ('.swp', '.swx', '~', '.tmp')
+
+    def __init__(self, paths):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self.trees = [path for path in paths if os.path.isdir(path)]
+        for path in paths:
+            if os.path.isdir(path):
+                self.add_tree(path)
+            else:
+                self.add(os.path.dirname(path))
+
+    def add(self, directory):
+        if directory in self.watches.values():
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def add_tree(self, path):
+        for root, dirs, _ in os.walk(path):
+            dirs[:] = [d for d in dirs if d not in ('.git', '__pycache__')]
+            self.add(root)
+
+    def read_events(self):
+        changed = set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if wd not in self.watches or not name or name.endswith(self.IGNORED_SUFFIXES) or name == '4913':
+                continue
+            path = os.path.join(self.watches[wd], name)
+            if (mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO) and os.path.isdir(path)
+                    and any(path.startswith(tree + os.sep) for tree in self.trees)):
+                self.add_tree(path)
+            changed.add(path)
+        return changed
+
+    def changes(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        changed = set()
+        while ready:
+            changed |= self.read_events()
+            ready, _, _ = select.select([self.fd], [], [], self.DEBOUNCE)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+# ------------------------------- Offline Bundle Class --------------------------- #
+
+class OfflineBundle:
+
+    INDEX = 'index.json'
+    STORED_SUFFIXES = ('.gz', '.zip', '.png', '.jpg', '.bundle')
+    EXCLUDED = ('.git', '__pycache__', 'install.log', 'install-trace.json', 'install-trace.chrome.json')
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.zip = zipfile.ZipFile(self.path)
+        self.index = json.loads(self.zip.read(self.INDEX))
+
+    def artifact(self, name):
+        return self.index['artifacts'].get(name)
+
+    def extract_member(self, member, dest, sha256=None):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = f"{dest}.tmp-{os.getpid()}"
+        with self.zip.open(member) as fsrc, open(tmp_path, 'wb') as fdst:
+            reader = HashingReader(fsrc)
+            shutil.copyfileobj(reader, fdst, 1024 * 1024)
+        if sha256 and reader.sha256.hexdigest() != sha256:
+            os.remove(tmp_path)
+            raise ValueError(f"Checksum mismatch for {member} in {self.path}")
+        os.replace(tmp_path, dest)
+        return dest
+
+    def extract_artifact(self, name, dest_dir):
+        entry = self.artifact(name)
+        return self.extract_member(entry['member'], os.path.join(dest_dir, os.path.basename(entry['member'])), entry['sha256'])
+
+    def extract_assets(self, relpath, dest_dir):
+        extracted = []
+        for asset, entry in self.index['assets'].items():
+            if asset == relpath or asset.startswith(relpath.rstrip('/') + '/'):
+                extracted.append(self.extract_member(entry['member'], os.path.join(dest_dir, asset), entry['sha256']))
+        return extracted
+
+    @classmethod
+    def create(cls, path, artifacts, assets_dir):
+        index = {'version': 1, 'created': time.time(), 'artifacts': {}, 'assets': {}}
+        output = os.path.abspath(path)
+        with zipfile.ZipFile(path, 'w') as zf:
+            def add(source, member):
+                compression = zipfile.ZIP_STORED if member.endswith(cls.STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+                zf.write(source, member, compress_type=compression)
+                return {'member': member, 'size': os.path.getsize(source), 'sha256': AssetDeployer.digest(source)}
+
+            for name, artifact in artifacts.items():
+                entry = add(artifact['path'], f"remote/{os.path.basename(artifact['path'])}")
+                entry.update({k: v for k, v in artifact.items() if k != 'path'})
+                index['artifacts'][name] = entry
+            for root, dirs, files in os.walk(assets_dir):
+                dirs[:] = sorted(d for d in dirs if d not in cls.EXCLUDED)
+                for name in sorted(files):
+                    source = os.path.join(root, name)
+                    if name in cls.EXCLUDED or name.endswith('.pyc') or os.path.abspath(source) == output:
+                        continue
+                    relpath = os.path.relpath(source, assets_dir)
+                    index['assets'][relpath] = add(source, f"assets/{relpath}")
+            zf.writestr(cls.INDEX, json.dumps(index, indent=2))
+        return index
+
+# ------------------------------- Privileged Broker Class --------------------------- #
+
+class BrokerError(Exception):
+    pass
+
+class PrivilegedBroker:
+
+    def __init__(self, script_path, command=('sudo',), tracer=None):
+        self.script_path = script_path
+        self.command = list(command)
+        self.tracer = tracer
+        self.process = None
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.next_id = 0
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.command + [sys.executable, self.script_path, '--broker'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        threading.Thread(target=self.read_responses, daemon=True).start()
+        self.call('ping')
+
+    def read_responses(self):
+        for line in self.process.stdout:
+            response = json.loads(line)
+            with self.lock:
+                waiter = self.pending.pop(response['id'], None)
+            if waiter:
+                waiter['results'] = response['results']
+                waiter['event'].set()
+        with self.lock:
+            waiters, self.pending = list(self.pending.values()), {}
+        for waiter in waiters:
+            waiter['event'].set()
+
+    def batch(self, ops):
+        if not self.tracer:
+            return self.send(ops)
+        name = ', '.join(' '.join(op['argv']) if op['op'] == 'run' else op['op'] for op in ops)
+        with self.tracer.span(f"broker: {name}", 'broker', operations=len(ops),
+                              processes=sum(1 for op in ops if op['op'] == 'run')) as entry:
+            results = self.send(ops)
+            codes = [result['value']['returncode'] for op, result in zip(ops, results)
+                     if op['op'] == 'run' and result['ok']]
+            entry['exit_code'] = 0 if all(result['ok'] for result in results) else 1
+            entry['bytes'] = sum(result['value'].get('bytes', 0) for result in results
+                                 if result['ok'] and isinstance(result.get('value'), dict))
+            if codes:
+                entry['exit_codes'] = codes
+            return results
+
+    def send(self, ops):
+        if not self.process or self.process.poll() is not None:
+            raise BrokerError("Privileged broker is not running")
+        waiter = {'event': threading.Event(), 'results': None}
+        with self.lock:
+            self.next_id += 1
+            request_id = self.next_id
+            self.pending[request_id] = waiter
+            self.process.stdin.write(json.dumps({'id': request_id, 'ops': ops}) + '\n')
+            self.process.stdin.flush()
+        waiter['event'].wait()
+        if waiter['results'] is None:
+            raise BrokerError("Privileged broker exited unexpectedly")
+        return waiter['results']
+
+    def call(self, op, **args):
+        result = self.batch([dict(args, op=op)])[0]
+        if not result['ok']:
+            raise BrokerError(result['error'])
+        return result.get('value')
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        self.process = None
+
+    # ---- Root side ---- #
+
+    @staticmethod
+    def chown(path, user, recursive=False):
+        entry = pwd.getpwnam(user)
+        os.lchown(path, entry.pw_uid, entry.pw_gid)
+        if recursive and os.path.isdir(path) and not os.path.islink(path):
+            for root, dirs, files in os.walk(path):
+                for name in dirs + files:
+                    os.lchown(os.path.join(root, name), entry.pw_uid, entry.pw_gid)
+
+    @staticmethod
+    def remove(path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
+
+    @staticmethod
+    def copy(src, dest, mode=None):
+        if os.path.isdir(src):
+            shutil.copytree(src, dest, dirs_exist_ok=True)
+        else:
+            shutil.copy2(src, dest)
+        if mode is not None:
+            os.chmod(dest, mode)
+
+    @staticmethod
+    def write(path, data, mode=0o644, backup=None):
+        if os.path.isfile(path):
+            with open(path) as f:
+                if f.read() == data:
+                    return
+            if backup:
+                shutil.copy2(path, backup)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def stage(sources):
+        stage_dir = tempfile.mkdtemp(prefix='dotfiles-gnome-stage-')
+        os.chmod(stage_dir, 0o755)
+        for name, src in sources.items():
+            dest = os.path.join(stage_dir, name)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            PrivilegedBroker.copy(src, dest)
+        for root, dirs, files in os.walk(stage_dir):
+            for name in dirs + files:
+                path = os.path.join(root, name)
+                if not os.path.islink(path):
+                    mode = os.stat(path).st_mode & 0o7777
+                    os.chmod(path, mode | (0o555 if os.path.isdir(path) or mode & 0o100 else 0o444))
+        return stage_dir
+
+    @staticmethod
+    def execute_as(user, script, ops):
+        home = pwd.getpwnam(user).pw_dir
+        helper = PrivilegedBroker(script, command=['runuser', '-u', user, '--', 'env', f'HOME={home}'])
+        helper.start()
+        try:
+            results = helper.send(ops)
+        finally:
+            helper.stop()
+        errors = [f"{op['op']}: {result['error']}" for op, result in zip(ops, results) if not result['ok']]
+        if errors:
+            raise BrokerError(f"Operations as {user} failed:\n" + '\n'.join(errors))
+        return [result.get('value') for result in results]
+
+    @staticmethod
+    def first_missing(path):
+        missing = None
+        while path and path != '/' and not os.path.lexists(path):
+            missing, path = path, os.path.dirname(path)
+        return missing
+
+    @staticmethod
+    def symlink(src, dest):
+        if os.path.lexists(dest):
+            os.remove(dest)
+        os.symlink(src, dest)
+
+    @staticmethod
+    def run(argv, input=None, cwd=None, user=None):
+        if user and user != 'root':
+            argv = ['runuser', '-u', user, '--'] + argv
+        stdin = subprocess.DEVNULL if input is None else None
+        result = subprocess.run(argv, input=input, stdin=stdin, cwd=cwd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise BrokerError(f"{argv} exited with {result.returncode}\nOutput: {result.stdout}\nError: {result.stderr}")
+        return {'returncode': result.returncode, 'stdout': result.stdout, 'stderr': result.stderr}
+
+    @staticmethod
+    def run_logged(argv, path, input=None, cwd=None, user=None):
+        if user and user != 'root':
+            argv = ['runuser', '-u', user, '--'] + argv
+        returncode, tail = OutputLog.run(argv, path, input=input, cwd=cwd)
+        if returncode != 0:
+            raise BrokerError(f"{argv} exited with {returncode} (full output in {path})\n" + '\n'.join(tail))
+        return {'returncode': returncode, 'tail': tail}
+
+    OPERATIONS = {
+        'ping': lambda: os.getuid(),
+        'exists': lambda path: os.path.exists(path),
+        'isdir': lambda path: os.path.isdir(path),
+        'mkdir': lambda path, mode=0o755: os.makedirs(path, mode=mode, exist_ok=True),
+        'chmod': lambda path, mode: os.chmod(path, mode),
+        'chown': lambda path, user, recursive=False: PrivilegedBroker.chown(path, user, recursive),
+        'copy': lambda src, dest, mode=None: PrivilegedBroker.copy(src, dest, mode),
+        'move': lambda src, dest: shutil.move(src, dest),
+        'remove': lambda path: PrivilegedBroker.remove(path),
+        'symlink': lambda src, dest: PrivilegedBroker.symlink(src, dest),
+        'write': lambda path, data, mode=0o644, backup=None: PrivilegedBroker.write(path, data, mode, backup),
+        'touch': lambda path: open(path, 'a').close(),
+        'deploy': lambda src, dest, mode=0o644, backup=None: AssetDeployer.deploy(src, dest, mode, backup),
+        'install_tarball': lambda source, parent_dir, sha256=None, required=None, member=None: AssetDeployer.install_tarball(source, parent_dir, sha256, required, member),
+        'extract_zip': lambda archive, dest_dir, mode=0o644: AssetDeployer.extract_zip(archive, dest_dir, mode),
+        'sync_tree': lambda src_dir, dest_dir, previous=None: AssetDeployer.sync_tree(src_dir, dest_dir, previous),
+        'deploy_many': lambda src, dests, mode=0o644, backup_suffix=None: AssetDeployer.deploy_many(src, dests, mode, backup_suffix),
+        'run': lambda argv, input=None, cwd=None, user=None: PrivilegedBroker.run(argv, input, cwd, user),
+        'run_logged': lambda argv, path, input=None, cwd=None, user=None: PrivilegedBroker.run_logged(argv, path, input, cwd, user),
+        'stage': lambda sources: PrivilegedBroker.stage(sources),
+        'as_user': lambda user, script, ops: PrivilegedBroker.execute_as(user, script, ops),
+    }
+
+    @classmethod
+    def execute(cls, ops):
+        results = []
+        for request in ops:
+            args = dict(request)
+            handler = cls.OPERATIONS.get(args.pop('op', None))
+            owner = args.pop('owner', None)
+            target = args.get('dest') or args.get('dest_dir') or args.get('path')
+            try:
+                if handler is None:
+                    raise BrokerError(f"Unknown operation: {request.get('op')}")
+                created = cls.first_missing(target) if owner and target else None
+                value = handler(**args)
+                if owner and target:
+                    cls.chown(created or target, owner, recursive=bool(created))
+                results.append({'ok': True, 'value': value})
+            except Exception as e:
+                results.append({'ok': False, 'error': str(e)})
+        return results
+
+    @classmethod
+    def serve(cls):
+        write_lock = threading.Lock()
+
+        def handle(request):
+            response = json.dumps({'id': request['id'], 'results': cls.execute(request['ops'])})
+            with write_lock:
+                sys.stdout.write(response + '\n')
+                sys.stdout.flush()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for line in sys.stdin:
+                if line.strip():
+                    pool.submit(handle, json.loads(line))
+
 # ------------------------------- Combined Installer Class --------------------------- #
 
 class CombinedInstaller:
 
-    def __init__(self):
-        if os.getuid() == 0:
+    CUSTOM_EXTENSIONS = [
+        "top-panel-ethernet@kali.org",
+        "top-panel-target@kali.org",
+        "top-panel-vpnip@kali.org",
+        "top-bar-organizer@julian.gse.jsts.xyz"
+    ]
+    DASH_TO_PANEL = "dash-to-panel@jderose9.github.com"
+    GRUB_THEME_DIRS = [
+        sysroot("/boot/grub/themes/kali"),
+        sysroot("/usr/share/grub/themes/kali"),
+        sysroot("/usr/share/desktop-base/kali-theme/grub")
+    ]
+    CTF_FOLDERS = [
+        sysroot("/root/machines_vuln/HTB"),
+        sysroot("/root/machines_vuln/Vulnhub"),
+        sysroot("/root/machines_vuln/DockerLabs")
+    ]
+    KEYBOARD_SHORTCUTS = [
+        {"name": "Terminator", "command": "/usr/bin/terminator", "shortcut": "<Super>Return"},
+        {"name": "Obsidian", "command": "/usr/bin/obsidian", "shortcut": "<Super><Shift>o"},
+        {"name": "Screenshot", "command": "flameshot gui", "shortcut": "Print"},
+        {"name": "Burpsuite", "command": "/usr/bin/burpsuite", "shortcut": "<Super><Shift>b"},
+        {"name": "Firefox", "command": "/usr/bin/firefox", "shortcut": "<Super><Shift>f"},
+        {"name": "Nautilus", "command": "/usr/bin/nautilus", "shortcut": "<Super>e"}
+    ]
+    DCONF_LAYOUTS = {
+        "dash-to-panel-settings.dconf": ('/org/gnome/shell/extensions/dash-to-panel/', "Dash to Panel"),
+        "top-bar-organizer.dconf": ('/org/gnome/shell/extensions/top-bar-organizer/', "Top Bar Organizer"),
+        "top-bar-organizer-dash-to-dock.dconf": ('/org/gnome/shell/extensions/top-bar-organizer/', "Top Bar Organizer")
+    }
+    REMOTE_ARTIFACTS = {
+        'neovim': {
+            'url': "https://github.com/neovim/neovim/releases/download/nightly/nvim-linux-x86_64.tar.gz",
+            'checksums': "https://github.com/neovim/neovim/releases/download/nightly/shasum.txt"
+        },
+        'dash-to-panel': {
+            'repo': "https://github.com/home-sweet-gnome/dash-to-panel.git",
+            'release': "https://github.com/home-sweet-gnome/dash-to-panel/releases/download/{tag}/dash-to-panel@jderose9.github.com_{tag}.zip"
+        },
+        'fzf': {'repo': "https://github.com/junegunn/fzf.git"},
+        'nvchad': {'repo': "https://github.com/NvChad/starter"}
+    }
+    PACKAGES = [
+        'xclip', 'zsh', 'lsd', 'bat', 'terminator', 'kitty',
+        'keepassxc', 'gnome-shell-extensions', 'flameshot'
+    ]
+    REQUIREMENTS = {
+        'git': {'pkg': 'git', 'desc': 'Git'},
+        'make': {'pkg': 'make', 'desc': 'Make'},
+        'msgfmt': {'pkg': 'gettext', 'desc': 'Gettext'},
+        'gnome-extensions': {'pkg': 'gnome-shell', 'desc': 'GNOME Extensions CLI'},
+        'dconf': {'pkg': 'dconf-cli', 'desc': 'Dconf CLI'}
+    }
+    PANEL_DAEMON = "panel-state-daemon"
+    PANEL_DAEMON_UNIT = """[Unit]
+Description=Publish network and target state for the top panel indicators
+PartOf=graphical-session.target
+
+[Service]
+ExecStart=/usr/bin/python3 %h/.config/bin/panel-state-daemon.py
+Restart=on-failure
+
+[Install]
+WantedBy=default.target
+"""
+    ALIASES_BEGIN = "# >>> dotfiles-gnome aliases >>>"
+    ALIASES_END = "# <<< dotfiles-gnome aliases <<<"
+
+    def __init__(self, force=False, users=None, bundle=None, apt_options=None, optimize_images=False, prescale_images=False,
+                 assume_yes=False):
+        if os.getuid() == 0 and SYSROOT == '/':
             print(f"{KaliStyle.ERROR} Do not run this script with sudo or as root. Use a normal user like 'kali'.")
             sys.exit(1)
         
         original_user = os.environ.get('SUDO_USER', os.environ.get('USER') or Path.home().name)
-        self.home_dir = os.path.expanduser(f'~{original_user}')
+        self.home_dir = os.environ.get('DOTFILES_HOME') or os.path.expanduser(f'~{original_user}')
         self.current_user = original_user
         self.extensions_dir = os.path.join(self.home_dir, '.local/share/gnome-shell/extensions')
-        self.temp_dir = '/tmp/gnome-extensions-install'
+        self.temp_dir = os.path.join(tempfile.gettempdir(), 'gnome-extensions-install')
         self.config_dir = os.path.join(self.home_dir, '.config')
         self.script_dir = os.path.dirname(os.path.realpath(__file__))
         self.pictures_dir = os.path.join(self.home_dir, 'Pictures')
-        self.actions_taken = []  
         self.needs_gdm_restart = False
         self.dash_to_panel_installed = False
+        self.force = force
+        self.assume_yes = assume_yes
+        self.users = users or []
+        self.bundle = OfflineBundle(bundle) if bundle else None
+        self.bundle_lock = threading.Lock()
+        self.mirror_lock = threading.Lock()
+        self.mirror_locks = {}
+        self.mirrored = {}
+        self.tracer = Tracer()
+        self.settings = SettingsBatch(runner=self.tracer.run)
+        self._broker = None
+        self.broker_lock = threading.Lock()
+        self.state_dir = os.path.join(self.home_dir, '.local/state/dotfiles-gnome')
+        self.mirror_dir = os.path.join(self.home_dir, '.cache/dotfiles-gnome/git')
+        self.download_dir = os.path.join(self.home_dir, '.cache/dotfiles-gnome/downloads')
+        self.downloader = Downloader()
+        self.log_dir = os.path.join(self.state_dir, 'logs')
+        self.manifest = StateManifest(os.path.join(self.state_dir, 'state.json'))
+        self.journal = ActionJournal(os.path.join(self.state_dir, 'journal.jsonl'))
+        self.verifier = InstallVerifier(DigestCache(os.path.join(self.state_dir, 'digests.json')))
+        self.preflight_cache = Preflight(os.path.join(self.state_dir, 'preflight.json'), runner=self.tracer.run)
+        self.capabilities = None
+        self.optimize_images = optimize_images or prescale_images
+        self.prescale_images = prescale_images
+        self.images = ImageOptimizer(os.path.join(self.home_dir, '.cache/dotfiles-gnome/images'), prescale=prescale_images, runner=self.tracer.run)
+        self.apt_options = [arg for option in (apt_options or []) for arg in ('-o', option)]
+        self.prefetch = None
+        if not self.force:
+            self.dash_to_panel_installed = self.manifest.data['settings'].get('dash_to_panel_installed', False)
         
         log_path = os.path.join(self.script_dir, 'install.log')
         if os.path.exists(log_path) and not os.access(log_path, os.W_OK):
@@ -80,18 +1897,88 @@ class CombinedInstaller:
         print(f"{KaliStyle.WHITE}\t\t [ Dotfiles GNOME - v.1.2.0 ]{KaliStyle.RESET}")
         print(f"{KaliStyle.GREY}\t\t  [ Created by SkyW4r33x ]{KaliStyle.RESET}\n")
 
+    @property
+    def broker(self):
+        with self.broker_lock:
+            if self._broker is None:
+                broker = PrivilegedBroker(os.path.realpath(__file__), tracer=self.tracer)
+                broker.start()
+                self._broker = broker
+            return self._broker
+
+    def privileged(self, *ops):
+        try:
+            results = self.broker.batch(list(ops))
+        except BrokerError as e:
+            logging.error(f"Privileged broker error: {str(e)}")
+            return False
+        failed = [(op, result['error']) for op, result in zip(ops, results) if not result['ok']]
+        for op, error in failed:
+            logging.error(f"Privileged operation failed: {op} - {error}")
+        return not failed
+
+    def image_source(self, path):
+        if not self.optimize_images:
+            return path
+        try:
+            with self.tracer.span(f"optimize {os.path.basename(path)}", 'image') as span:
+                optimized, method = self.images.optimize(path)
+                span['method'] = method
+            if optimized != path:
+                saved = (os.path.getsize(path) - os.path.getsize(optimized)) / 1024
+                print(f"{KaliStyle.SUCCESS} Optimized {os.path.basename(path)} ({method}, {saved:.0f} KiB smaller)")
+            return optimized
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            print(f"{KaliStyle.WARNING} Could not optimize {os.path.basename(path)}, using the original")
+            logging.error(f"Error optimizing {path}: {str(e)}")
+            return path
+
+    def record_deploy(self, result):
+        if not result['changed']:
+            return
+        if result['backup']:
+            self.journal.record({'type': 'backup', 'backup': result['backup'], 'original': result['dest']})
+        else:
+            self.journal.record({'type': 'file_copy', 'dest': result['dest']})
+
+    def deploy_asset(self, src, dest, mode=0o644, backup=None, privileged=True):
+        try:
+            if privileged:
+                result = self.broker.call('deploy', src=src, dest=dest, mode=mode, backup=backup)
+            else:
+                result = AssetDeployer.deploy(src, dest, mode, backup)
+        except Exception as e:
+            logging.error(f"Error deploying {src} to {dest}: {str(e)}")
+            return None
+        self.record_deploy(result)
+        return result
+
+    def task_log(self, privileged=False):
+        name = self.journal.task or 'installer'
+        return os.path.join(self.log_dir, f"{name}{'.root' if privileged else ''}.log")
+
     def run_command(self, command, shell=False, sudo=False, quiet=True):
         try:
-            if sudo and not shell:
-                command = ['sudo'] + command
-            result = subprocess.run(
-                command,
-                shell=shell,
-                check=True,
-                stdout=subprocess.PIPE if quiet else None,
-                stderr=subprocess.PIPE if quiet else None,
-                text=True
-            )
+            if sudo:
+                argv = ['sh', '-c', command] if shell else command
+                if quiet:
+                    self.broker.call('run_logged', argv=argv, path=self.task_log(privileged=True), owner=self.current_user)
+                    return True
+                result = self.broker.call('run', argv=argv)
+                print(result['stdout'], end='')
+                if result['stderr']:
+                    print(result['stderr'], end='', file=sys.stderr)
+                    logging.warning(f"Command {command} wrote to stderr:\n{result['stderr']}")
+                return True
+            if quiet:
+                log_path = self.task_log()
+                returncode, tail = self.tracer.stream(command, log_path, shell=shell)
+                if returncode != 0:
+                    output = '\n'.join(tail)
+                    logging.error(f"Error executing command: {command} - exit {returncode} (full output in {log_path})\n{output}")
+                    return False
+                return True
+            self.tracer.run(command, shell=shell, check=True, text=True)
             return True
         except subprocess.CalledProcessError as e:
             if not quiet:
@@ -100,36 +1987,51 @@ class CombinedInstaller:
                 print(f"Error: {e.stderr}")
             logging.error(f"Error executing command: {command} - {e}\nOutput: {e.stdout}\nError: {e.stderr}")
             return False
+        except BrokerError as e:
+            if not quiet:
+                print(f"{KaliStyle.ERROR} Error executing command: {command}")
+                print(str(e), file=sys.stderr)
+            logging.error(f"Error executing command: {command} - {e}")
+            return False
         except PermissionError:
             print(f"{KaliStyle.ERROR} Insufficient permissions to execute: {command}")
             return False
 
     def check_command(self, command):
-        try:
-            subprocess.run([command, "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            return True
-        except FileNotFoundError:
-            return False
+        return self.preflight_cache.which(command) is not None
 
     def get_gnome_version(self):
         try:
-            result = subprocess.run(['gnome-shell', '--version'], capture_output=True, text=True)
-            version_str = result.stdout.strip().split()[-1]  
-            major = int(version_str.split('.')[0])
-            return major
+            return self.preflight_cache.gnome_major()
         except Exception as e:
             logging.error(f"Error getting GNOME version: {str(e)}")
             return None
 
+    def probe_capabilities(self):
+        try:
+            return self.preflight_cache.probe(list(self.REQUIREMENTS))
+        except Exception as e:
+            logging.error(f"Error probing capabilities: {str(e)}")
+            return {'commands': {command: self.check_command(command) for command in self.REQUIREMENTS},
+                    'gnome_major': self.get_gnome_version()}
+
+    def preflight(self):
+        checks = [self.check_os, self.check_sudo_privileges, self.check_required_files, self.check_graphical_environment]
+        with self.tracer.span("Preflight checks", 'preflight'), ThreadPoolExecutor(max_workers=len(checks) + 1) as pool:
+            capabilities = pool.submit(self.probe_capabilities)
+            results = list(pool.map(lambda check: check(), checks))
+            self.capabilities = capabilities.result()
+        return all(results)
+
     def check_os(self):
-        if not os.path.exists('/etc/debian_version'):
+        if not os.path.exists(sysroot('/etc/debian_version')):
             print(f"{KaliStyle.ERROR} This script is designed for Debian/Kali based systems")
             return False
         return True
 
     def check_sudo_privileges(self):
         try:
-            result = subprocess.run(['sudo', '-n', 'true'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            result = self.tracer.run(['sudo', '-n', 'true'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             if result.returncode == 0:
                 return True
             else:
@@ -157,6 +2059,12 @@ class CombinedInstaller:
             "gnome-extensions"
         ]
         missing = [f for f in required_files if not os.path.exists(os.path.join(self.script_dir, f))]
+        if missing and self.bundle:
+            for f in missing:
+                extracted = self.bundle.extract_assets(f, self.script_dir)
+                if extracted:
+                    print(f"{KaliStyle.SUCCESS} Extracted {f} from offline bundle ({len(extracted)} files)")
+            missing = [f for f in required_files if not os.path.exists(os.path.join(self.script_dir, f))]
         if missing:
             print(f"{KaliStyle.ERROR} Missing required files: {', '.join(missing)}")
             print(f"{KaliStyle.INFO} Make sure they are in {self.script_dir}")
@@ -171,12 +2079,7 @@ class CombinedInstaller:
             print(f"{KaliStyle.ERROR} gnome-extensions folder not found in {source_extensions_dir}")
             return False
         
-        custom_extensions = [
-            "top-panel-ethernet@kali.org",
-            "top-panel-target@kali.org", 
-            "top-panel-vpnip@kali.org",
-            "top-bar-organizer@julian.gse.jsts.xyz"
-        ]
+        custom_extensions = self.CUSTOM_EXTENSIONS
         
         os.makedirs(self.extensions_dir, exist_ok=True)
         
@@ -189,15 +2092,8 @@ class CombinedInstaller:
                 print(f"{KaliStyle.ERROR} Extension {extension} not found in {source_path}")
                 continue
                 
-            if os.path.exists(dest_path):
-                print(f"{KaliStyle.WARNING} Extension {extension} already exists, skipping copy.")
-                success_count += 1
-                continue
-            
             try:
-                shutil.copytree(source_path, dest_path)
-                self.actions_taken.append({'type': 'dir_copy', 'dest': dest_path})
-                print(f"{KaliStyle.SUCCESS} Extension {extension} installed")
+                self.sync_folder(source_path, dest_path, f"Extension {extension}")
                 success_count += 1
                 
             except Exception as e:
@@ -222,23 +2118,17 @@ class CombinedInstaller:
 
     def check_gnome_requirements(self):
         print(f"{KaliStyle.INFO} Checking requirements for GNOME extensions...")
-        requirements = {
-            'git': {'pkg': 'git', 'desc': 'Git'},
-            'make': {'pkg': 'make', 'desc': 'Make'},
-            'msgfmt': {'pkg': 'gettext', 'desc': 'Gettext'},
-            'gnome-extensions': {'pkg': 'gnome-shell', 'desc': 'GNOME Extensions CLI'},
-            'dconf': {'pkg': 'dconf-cli', 'desc': 'Dconf CLI'}
-        }
-        
+        capabilities = self.capabilities or self.probe_capabilities()
+
         missing_pkgs = []
-        for command, info in requirements.items():
-            if not self.check_command(command):
+        for command, info in self.REQUIREMENTS.items():
+            if not capabilities['commands'].get(command):
                 missing_pkgs.append(info['pkg'])
                 print(f"{KaliStyle.ERROR} Missing {command} ({info['desc']})")
             else:
                 print(f"{KaliStyle.SUCCESS} Found {command}")
 
-        gnome_major = self.get_gnome_version()
+        gnome_major = capabilities['gnome_major']
         if gnome_major is None or gnome_major < 42 or gnome_major > 48:
             print(f"{KaliStyle.ERROR} Incompatible GNOME version or not detected (detected: {gnome_major}). Extensions may fail.")
             missing_pkgs.append('gnome-shell')  
@@ -249,65 +2139,86 @@ class CombinedInstaller:
         print(f"{KaliStyle.SUCCESS} Requirements verified")
         return True
 
+    def apt_command(self, *args):
+        return ['apt-get'] + self.apt_options + list(args)
+
+    def prefetch_packages(self, packages):
+        log_path = os.path.join(self.log_dir, 'apt-prefetch.root.log')
+        with self.tracer.span("apt prefetch", 'download', packages=len(packages)):
+            self.broker.call('run_logged', argv=self.apt_command('update'), path=log_path, owner=self.current_user)
+            self.broker.call('run_logged', argv=self.apt_command('install', '-y', '--download-only', *packages),
+                             path=log_path, owner=self.current_user)
+        return True
+
+    def start_package_prefetch(self):
+        installed = self.preflight_cache.package_versions(self.PACKAGES)
+        missing = [pkg for pkg in self.PACKAGES if pkg not in installed]
+        if not missing:
+            return
+        try:
+            self.broker
+        except BrokerError as e:
+            logging.error(f"Could not start the privileged broker for the package prefetch: {str(e)}")
+            return
+        print(f"{KaliStyle.INFO} Downloading {len(missing)} packages in the background...")
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.prefetch = pool.submit(self.prefetch_packages, missing)
+        pool.shutdown(wait=False)
+
+    def wait_for_prefetch(self):
+        if self.prefetch is None:
+            return False
+        try:
+            return self.prefetch.result()
+        except BrokerError as e:
+            logging.error(f"Package prefetch failed: {str(e)}")
+            return False
+        finally:
+            self.prefetch = None
+
     def install_additional_packages(self):
         print(f"\n{KaliStyle.INFO} Installing tools")
-        self.packages = [
-            'xclip', 'zsh', 'lsd', 'bat', 'terminator', 'kitty',
-            'keepassxc', 'gnome-shell-extensions', 'flameshot'
-        ]
-        self.max_length = max(len(pkg) for pkg in self.packages)
-        self.state_length = 12
-        self.states = {pkg: f"{KaliStyle.GREY}Pending{KaliStyle.RESET}" for pkg in self.packages}
-        
-        def print_status(first_run=False):
-            if not first_run:
-                print(f"\033[{len(self.packages) + 1}A", end="")
-            
-            print(f"{KaliStyle.INFO} Installing packages:")
-            for pkg, state in self.states.items():
-                print(f"\033[K", end="")
-                print(f"  {KaliStyle.YELLOW}•{KaliStyle.RESET} {pkg:<{self.max_length}} {state:<{self.state_length}}")
-            sys.stdout.flush()
+        self.packages = self.PACKAGES
 
         try:
-            print(f"{KaliStyle.INFO} Updating repositories...")
-            if not self.run_command(['apt', 'update'], sudo=True, quiet=True):
-                print(f"{KaliStyle.ERROR} Error updating repositories")
-                return False
-            print(f"{KaliStyle.SUCCESS} Repositories updated")
+            prefetched = self.wait_for_prefetch()
+            if prefetched:
+                print(f"{KaliStyle.SUCCESS} Packages already downloaded, installing from the local cache")
+            else:
+                print(f"{KaliStyle.INFO} Updating repositories...")
+                if not self.run_command(self.apt_command('update'), sudo=True, quiet=True):
+                    print(f"{KaliStyle.ERROR} Error updating repositories")
+                    return False
+                print(f"{KaliStyle.SUCCESS} Repositories updated")
+            install_args = ['install', '-y', '--no-download'] if prefetched else ['install', '-y']
 
-            print_status(first_run=True)
             failed_packages = []
-            for pkg in self.packages:
-                check_installed = subprocess.run(['dpkg-query', '-s', pkg], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                if check_installed.returncode == 0:
-                    self.states[pkg] = f"{KaliStyle.GREEN}Already installed{KaliStyle.RESET}"
-                    print_status()
-                    continue
-                
-                self.states[pkg] = f"{KaliStyle.YELLOW}Installing...{KaliStyle.RESET}"
-                print_status()
-                try:
-                    if self.run_command(['apt', 'install', '-y', pkg], sudo=True, quiet=True):
-                        self.states[pkg] = f"{KaliStyle.GREEN}Completed{KaliStyle.RESET}"
-                        self.actions_taken.append({'type': 'package', 'pkg': pkg})  
-                    else:
-                        self.states[pkg] = f"{KaliStyle.RED}Failed{KaliStyle.RESET}"
+            with ProgressRenderer("Installing packages", self.packages) as progress:
+                for pkg in self.packages:
+                    check_installed = self.tracer.run(['dpkg-query', '-s', pkg], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    if check_installed.returncode == 0:
+                        progress.update(pkg, "Already installed", KaliStyle.GREEN)
+                        continue
+
+                    progress.update(pkg, "Installing...", KaliStyle.YELLOW)
+                    try:
+                        if self.run_command(self.apt_command(*install_args, pkg), sudo=True, quiet=True):
+                            self.preflight_cache.invalidate()
+                            progress.update(pkg, "Completed", KaliStyle.GREEN)
+                            self.journal.record({'type': 'package', 'pkg': pkg})
+                        else:
+                            progress.update(pkg, "Failed", KaliStyle.RED)
+                            failed_packages.append(pkg)
+                    except subprocess.CalledProcessError as e:
+                        progress.update(pkg, "Failed", KaliStyle.RED)
                         failed_packages.append(pkg)
-                        print(f"{KaliStyle.WARNING} Warning: Failed to install {pkg}, continuing...")
-                except subprocess.CalledProcessError as e:
-                    self.states[pkg] = f"{KaliStyle.RED}Failed{KaliStyle.RESET}"
-                    failed_packages.append(pkg)
-                    logging.error(f"Error installing {pkg}: {e}\nOutput: {e.stdout}\nError: {e.stderr}")
-                    print(f"{KaliStyle.WARNING} Warning: Failed to install {pkg}, continuing...")
-                print_status()
-                time.sleep(0.2)
-            
+                        logging.error(f"Error installing {pkg}: {e}\nOutput: {e.stdout}\nError: {e.stderr}")
+
             if failed_packages:
-                print(f"\n{KaliStyle.WARNING} The following packages failed: {', '.join(failed_packages)}")
+                print(f"\n{KaliStyle.ERROR} The following packages failed: {', '.join(failed_packages)}")
                 print(f"{KaliStyle.INFO} Check install.log for more details.")
-            else:
-                print(f"\n{KaliStyle.SUCCESS} Installation completed")
+                return False
+            print(f"\n{KaliStyle.SUCCESS} Installation completed")
             return True
         except Exception as e:
             print(f"\n{KaliStyle.ERROR} Error installing packages: {str(e)}")
@@ -323,7 +2234,7 @@ class CombinedInstaller:
         print(f" {KaliStyle.TURQUOISE}→{KaliStyle.RESET} {KaliStyle.WHITE}No{KaliStyle.RESET}: Keep default Dash to Dock - {KaliStyle.BLUE}https://i.imgur.com/Ro4z815.png{KaliStyle.RESET}")
         while True:
             try:
-                response = input(f"\n{KaliStyle.SUDO_COLOR}[*]{KaliStyle.RESET} Install Dash to Panel? (Y/n): ").lower().strip()
+                response = '' if self.assume_yes else input(f"\n{KaliStyle.SUDO_COLOR}[*]{KaliStyle.RESET} Install Dash to Panel? (Y/n): ").lower().strip()
                 if response == '' or response == 'y' or response == 'yes':
                     self.dash_to_panel_installed = True
                     print(f"{KaliStyle.SUCCESS} Dash to Panel will be installed")
@@ -357,30 +2268,41 @@ class CombinedInstaller:
         self.manage_extensions(quiet=True)
         return True 
 
+    def download_dash_to_panel(self, dest_dir=None):
+        dest_dir = dest_dir or self.download_dir
+        os.makedirs(dest_dir, exist_ok=True)
+        if self.bundle and self.bundle.artifact('dash-to-panel'):
+            zip_path = self.bundle.extract_artifact('dash-to-panel', dest_dir)
+            latest_tag = self.bundle.artifact('dash-to-panel')['version']
+            print(f"{KaliStyle.SUCCESS} Using zip of version {latest_tag} from offline bundle")
+            return zip_path, latest_tag
+
+        remote = self.REMOTE_ARTIFACTS['dash-to-panel']
+        tags_output = self.tracer.run(["git", "ls-remote", "--tags", remote['repo']], check=True, stdout=subprocess.PIPE).stdout
+        tags = [line.decode().split()[-1].replace('refs/tags/', '') for line in tags_output.splitlines() if '^' not in line.decode()]
+        latest_tag = sorted(tags, key=lambda t: int(t.replace('v', '')))[-1]  
+        
+        zip_url = remote['release'].format(tag=latest_tag)
+        zip_path = self.download(zip_url, os.path.join(dest_dir, f"dash-to-panel-{latest_tag}.zip"))
+        print(f"{KaliStyle.SUCCESS} Downloaded zip of version {latest_tag}")
+        return zip_path, latest_tag
+
     def install_dash_to_panel(self):
         print(f"\n{KaliStyle.INFO} Installing Dash to Panel (latest release)...")
         ext_paths = [
             os.path.join(self.extensions_dir, "dash-to-panel@jderose9.github.com"),
-            "/usr/share/gnome-shell/extensions/dash-to-panel@jderose9.github.com"
+            sysroot("/usr/share/gnome-shell/extensions/dash-to-panel@jderose9.github.com")
         ]
         if any(os.path.exists(path) for path in ext_paths):
             print(f"{KaliStyle.WARNING} Dash to Panel already installed, skipping.")
             return True
         
         try:
-            tags_output = subprocess.check_output(["git", "ls-remote", "--tags", "https://github.com/home-sweet-gnome/dash-to-panel.git"])
-            tags = [line.decode().split()[-1].replace('refs/tags/', '') for line in tags_output.splitlines() if '^' not in line.decode()]
-            latest_tag = sorted(tags, key=lambda t: int(t.replace('v', '')))[-1]  
-            
-            zip_url = f"https://github.com/home-sweet-gnome/dash-to-panel/releases/download/{latest_tag}/dash-to-panel@jderose9.github.com_{latest_tag}.zip"
-            zip_path = os.path.join(self.temp_dir, "dash-to-panel.zip")
-            
-            urllib.request.urlretrieve(zip_url, zip_path)
-            print(f"{KaliStyle.SUCCESS} Downloaded zip of version {latest_tag}")
+            zip_path, latest_tag = self.download_dash_to_panel()
             
             if self.run_command(["gnome-extensions", "install", "--force", zip_path], quiet=True):
                 print(f"{KaliStyle.SUCCESS} Dash to Panel installed from release {latest_tag}")
-                self.actions_taken.append({'type': 'dir_copy', 'dest': ext_paths[0]})
+                self.journal.record({'type': 'dir_copy', 'dest': ext_paths[0]})
                 return True
             else:
                 print(f"{KaliStyle.ERROR} Error installing zip with gnome-extensions")
@@ -402,99 +2324,151 @@ class CombinedInstaller:
             if self.dash_to_panel_installed:
                 extensions_to_disable.append('dash-to-dock@micxgx.gmail.com')
             for ext in extensions_to_disable:
-                subprocess.run(['gnome-extensions', 'disable', ext], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                if not quiet:
+                self.settings.set_extension(ext, False)
+            if not self.settings.apply():
+                raise RuntimeError("dconf load failed")
+            if not quiet:
+                for ext in extensions_to_disable:
                     print(f"{KaliStyle.SUCCESS} Extension {ext} disabled (if it was active)")
         except Exception as e:
             if not quiet:
                 print(f"{KaliStyle.WARNING} Could not manage all extensions")
             logging.error(f"Error in manage_extensions: {str(e)}")
 
-    def enable_extensions(self):
+    def enable_extensions(self, verified=None):
         print(f"\n{KaliStyle.INFO} Enabling extensions...")
         
-        extensions = [
-            "top-panel-ethernet@kali.org",
-            "top-panel-target@kali.org", 
-            "top-panel-vpnip@kali.org",
-            "top-bar-organizer@julian.gse.jsts.xyz"
-        ]
+        extensions = list(self.CUSTOM_EXTENSIONS)
         if self.dash_to_panel_installed:
-            extensions.insert(0, "dash-to-panel@jderose9.github.com")
-        
-        enabled_count = 0
+            extensions.insert(0, self.DASH_TO_PANEL)
+        installed = [ext for ext in extensions if (ext in verified if verified is not None else self.extension_installed(ext))]
+
+        for ext in installed:
+            self.settings.set_extension(ext, True)
+
+        applied_configs = [name for name in self.active_dconf_layouts() if self.load_dconf_layout(name)]
+
+        if not self.settings.apply():
+            print(f"{KaliStyle.ERROR} Could not enable any extension")
+            return False
         for ext in extensions:
-            try:
-                subprocess.run(['gnome-extensions', 'enable', ext], check=True, stdout=subprocess.DEVNULL)
+            if ext in installed:
                 print(f"{KaliStyle.SUCCESS} {ext} enabled")
-                enabled_count += 1
-            except subprocess.CalledProcessError as e:
-                print(f"{KaliStyle.ERROR} Error enabling {ext}: {str(e)}")
-                logging.error(f"Error enabling extension {ext}: {str(e)}")
-            except Exception as e:
-                print(f"{KaliStyle.ERROR} Unexpected error enabling {ext}: {str(e)}")
-                logging.error(f"Error in enable_extensions: {str(e)}")
+            else:
+                print(f"{KaliStyle.ERROR} {ext} is not installed, not enabled")
+        for name in applied_configs:
+            print(f"{KaliStyle.SUCCESS} {self.DCONF_LAYOUTS[name][1]} configuration applied")
+        status = KaliStyle.SUCCESS if len(installed) == len(extensions) else KaliStyle.WARNING
+        print(f"{status} {len(installed)}/{len(extensions)} extensions enabled")
+        return True
+
+    def extension_installed(self, ext):
+        return (os.path.exists(os.path.join(self.extensions_dir, ext))
+                or os.path.exists(sysroot(f"/usr/share/gnome-shell/extensions/{ext}")))
 
+    def active_dconf_layouts(self):
         if self.dash_to_panel_installed:
-            dash_config_source = os.path.join(self.script_dir, "dash-to-panel-settings.dconf")
-            if os.path.exists(dash_config_source) and os.path.getsize(dash_config_source) > 0:
-                try:
-                    with open(dash_config_source, 'rb') as f:
-                        subprocess.run(['dconf', 'load', '/org/gnome/shell/extensions/dash-to-panel/'], 
-                                       input=f.read(), check=True)
-                    print(f"{KaliStyle.SUCCESS} Dash to Panel configuration applied")
-                except Exception as e:
-                    print(f"{KaliStyle.ERROR} Error applying Dash to Panel configuration: {str(e)}")
-                    logging.error(f"Error applying Dash to Panel configuration: {str(e)}")
-
-        top_bar_config_filename = "top-bar-organizer.dconf" if self.dash_to_panel_installed else "top-bar-organizer-dash-to-dock.dconf"
-        top_bar_config_source = os.path.join(self.script_dir, top_bar_config_filename)
-        if os.path.exists(top_bar_config_source) and os.path.getsize(top_bar_config_source) > 0:
-            try:
-                with open(top_bar_config_source, 'rb') as f:
-                    subprocess.run(['dconf', 'load', '/org/gnome/shell/extensions/top-bar-organizer/'], 
-                                   input=f.read(), check=True)
-                print(f"{KaliStyle.SUCCESS} Top Bar Organizer configuration applied")
-            except Exception as e:
-                print(f"{KaliStyle.ERROR} Error applying Top Bar Organizer configuration: {str(e)}")
-                logging.error(f"Error applying Top Bar Organizer configuration: {str(e)}")
-        
-        if enabled_count > 0:
-            print(f"{KaliStyle.SUCCESS} {enabled_count}/{len(extensions)} extensions enabled")
+            return ["dash-to-panel-settings.dconf", "top-bar-organizer.dconf"]
+        return ["top-bar-organizer-dash-to-dock.dconf"]
+
+    def load_dconf_layout(self, name):
+        source = os.path.join(self.script_dir, name)
+        if not os.path.exists(source) or os.path.getsize(source) == 0:
+            return False
+        with open(source) as f:
+            self.settings.load(self.DCONF_LAYOUTS[name][0], f.read())
+        return True
+
+    def apply_dconf_layout(self, name):
+        if name not in self.active_dconf_layouts():
+            print(f"{KaliStyle.INFO} {name} is not the active layout, nothing to apply")
             return True
-        else:
-            print(f"{KaliStyle.ERROR} Could not enable any extension")
+        if not self.load_dconf_layout(name):
+            print(f"{KaliStyle.WARNING} {name} is missing or empty, skipping")
+            return True
+        if not self.settings.apply():
+            print(f"{KaliStyle.ERROR} Could not load {name}")
             return False
+        print(f"{KaliStyle.SUCCESS} {self.DCONF_LAYOUTS[name][1]} configuration applied")
+        return True
 
     def verify_installation(self):
         print(f"\n{KaliStyle.INFO} Verifying installation...")
         
-        extensions_to_check = [
-            "top-panel-ethernet@kali.org",
-            "top-panel-target@kali.org", 
-            "top-panel-vpnip@kali.org",
-            "top-bar-organizer@julian.gse.jsts.xyz"
-        ]
+        extensions_to_check = list(self.CUSTOM_EXTENSIONS)
         if self.dash_to_panel_installed:
-            extensions_to_check.insert(0, "dash-to-panel@jderose9.github.com")
+            extensions_to_check.insert(0, self.DASH_TO_PANEL)
         
-        installed_count = 0
+        results = self.verifier.verify(trees=self.extension_trees(self.user_profile(self.current_user)))
+        drifted = {os.path.relpath(r['path'], self.extensions_dir).split(os.sep)[0] for r in results if r['status'] != 'ok'}
+
+        verified = []
         for ext in extensions_to_check:
             ext_path = os.path.join(self.extensions_dir, ext)
-            system_path = f"/usr/share/gnome-shell/extensions/{ext}"
-            if os.path.exists(ext_path) or os.path.exists(system_path):
-                print(f"{KaliStyle.SUCCESS} {ext} found")
-                installed_count += 1
+            system_path = sysroot(f"/usr/share/gnome-shell/extensions/{ext}")
+            if not os.path.exists(ext_path):
+                if os.path.exists(system_path):
+                    print(f"{KaliStyle.SUCCESS} {ext} found")
+                    verified.append(ext)
+                else:
+                    print(f"{KaliStyle.ERROR} {ext} not found")
+            elif ext in drifted:
+                print(f"{KaliStyle.ERROR} {ext} differs from the repository copy, run the installer with --force to redeploy it")
             else:
-                print(f"{KaliStyle.ERROR} {ext} not found")
-        
-        if installed_count > 0:
-            print(f"\n{KaliStyle.WARNING} Restart GNOME Shell {KaliStyle.GREY}(Alt + F2, 'r'){KaliStyle.RESET}")
-            input(f"\n{KaliStyle.SUDO_COLOR}[*]{KaliStyle.RESET} Press Enter after restarting GNOME Shell...")
-            self.enable_extensions()
+                print(f"{KaliStyle.SUCCESS} {ext} found")
+                verified.append(ext)
+
+        if verified:
+            self.enable_extensions(verified)
+            print(f"\n{KaliStyle.WARNING} Restart GNOME Shell {KaliStyle.GREY}(Alt + F2, 'r'){KaliStyle.RESET} to load the extensions")
             return True
         return False
 
+    def extension_trees(self, profile):
+        source_dir = os.path.join(self.script_dir, "gnome-extensions")
+        return [(os.path.join(source_dir, ext), os.path.join(profile['extensions_dir'], ext), True)
+                for ext in self.CUSTOM_EXTENSIONS if os.path.isdir(os.path.join(source_dir, ext))]
+
+    def verify_targets(self):
+        script = lambda *parts: os.path.join(self.script_dir, *parts)
+        files = [
+            (script("extractPorts.py"), sysroot("/usr/bin/extractPorts.py")),
+            (script("wallpaper", "browser-home-page-banner.jpg"), sysroot("/usr/share/kali-defaults/web/images/browser-home-page-banner.jpg")),
+            (script("wallpaper", "gdm_wallpaper.png"), sysroot("/usr/share/backgrounds/kali/login-blurred")),
+            (script("wallpaper", "kali-simple-3840x2160.png"), os.path.join(self.pictures_dir, "wallpaper", "kali-simple-3840x2160.png"))
+        ]
+        files += [(script("wallpaper", name), os.path.join(dest_dir, name))
+                  for name in ("grub-16x9.png", "grub-4x3.png") for dest_dir in self.GRUB_THEME_DIRS if os.path.isdir(dest_dir)]
+        trees = [(script("sudo-plugin"), sysroot("/usr/share/sudo-plugin"), False)]
+        for user in self.users or [self.current_user]:
+            profile = self.user_profile(user)
+            files.append((script("bin", f"{self.PANEL_DAEMON}.py"), self.panel_daemon_paths(profile['home'])['script']))
+            trees += self.extension_trees(profile)
+            trees += [(script(name), os.path.join(profile['config_dir'], name), True) for name in ("terminator", "kitty")]
+        files = [(self.image_source(src) if src.endswith('.png') else src, dest) for src, dest in files if os.path.exists(src)]
+        return {
+            'files': files,
+            'trees': [tree for tree in trees if os.path.isdir(tree[0])],
+            'archives': [(archive, dest_dir) for archive, dest_dir in [(script("JetBrainsMono.zip"), sysroot("/usr/share/fonts/JetBrainsMono"))]
+                         if os.path.exists(archive)]
+        }
+
+    def verify(self, report=None):
+        print(f"{KaliStyle.INFO} Verifying installed files against {self.script_dir}...")
+        started = time.perf_counter()
+        results = self.verifier.verify(**self.verify_targets())
+        elapsed = time.perf_counter() - started
+        drift = [result for result in results if result['status'] != 'ok']
+        for result in sorted(drift, key=lambda r: r['path']):
+            print(f"{KaliStyle.ERROR} {result['status']:<10} {result['path']}")
+        status = KaliStyle.SUCCESS if not drift else KaliStyle.WARNING
+        print(f"{status} {len(results) - len(drift)}/{len(results)} files match the repository ({elapsed:.2f}s)")
+        if report:
+            with open(report, 'w') as f:
+                json.dump({'host': os.uname().nodename, 'time': time.time(), 'results': results}, f, indent=2)
+            print(f"{KaliStyle.INFO} Report written to {report}")
+        return not drift
+
     def setup_dotfiles(self):
         print(f"\n{KaliStyle.INFO} Setting up dotfiles...")
         success = True
@@ -502,7 +2476,7 @@ class CombinedInstaller:
         if os.path.exists(zshrc_path):
             backup_path = f"{zshrc_path}.backup.{time.strftime('%Y%m%d_%H%M%S')}"
             shutil.copy2(zshrc_path, backup_path)
-            self.actions_taken.append({'type': 'file_copy', 'dest': backup_path})
+            self.journal.record({'type': 'file_copy', 'dest': backup_path})
             print(f"{KaliStyle.SUCCESS} Backup of .zshrc created")
 
         required_files = {'.zshrc': os.path.join(self.script_dir, ".zshrc")}
@@ -513,11 +2487,11 @@ class CombinedInstaller:
         
         if success:
             shutil.copy2(required_files['.zshrc'], self.home_dir)
-            self.actions_taken.append({'type': 'file_copy', 'dest': zshrc_path})
+            self.journal.record({'type': 'file_copy', 'dest': zshrc_path})
             self.install_fzf(self.current_user)
             self.install_fzf("root")
             if self.home_dir != '/root':  
-                subprocess.run(['sudo', 'ln', '-sf', zshrc_path, "/root/.zshrc"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self.broker.call('symlink', src=zshrc_path, dest=sysroot("/root/.zshrc"))
             else:
                 print(f"{KaliStyle.WARNING} Skipping link for root, as the script should not run as root.")
             self.install_neovim()
@@ -525,60 +2499,264 @@ class CombinedInstaller:
         return success
 
     def install_fzf(self, user):
-        home_dir = f"/home/{user}" if user != "root" else "/root"
-        fzf_dir = os.path.join(home_dir, ".fzf")
+        fzf_dir = os.path.join(self.user_profile(user)['home'], ".fzf")
         
         if user == "root":
-            check_result = subprocess.run(['sudo', 'test', '-d', fzf_dir], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            exists = (check_result.returncode == 0)
+            exists = self.broker.call('isdir', path=fzf_dir)
         else:
             exists = os.path.exists(fzf_dir)
         
         if not exists:
             print(f"{KaliStyle.INFO} Installing fzf for {user}...")
-            cmd = ["sudo"] if user == "root" else []
             try:
-                subprocess.run(cmd + ["git", "clone", "--depth", "1", "https://github.com/junegunn/fzf.git", fzf_dir], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-                subprocess.run(cmd + [f"{fzf_dir}/install", "--all"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                commands = self.clone_commands('fzf', fzf_dir, shallow=True, hardlinks=user != "root") + [[f"{fzf_dir}/install", "--all"]]
+                for command in commands:
+                    if user == "root":
+                        self.broker.call('run', argv=command)
+                    else:
+                        self.tracer.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
                 print(f"{KaliStyle.SUCCESS} fzf installed for {user}")
             except subprocess.CalledProcessError as e:
-                print(f"{KaliStyle.ERROR} Error installing fzf for {user}: {e.stderr.decode()}")
+                print(f"{KaliStyle.ERROR} Error installing fzf for {user}: {e.stderr.decode() if e.stderr else e}")
+                logging.error(f"Error in install_fzf for {user}: {str(e)}")
+                return False
+            except BrokerError as e:
+                print(f"{KaliStyle.ERROR} Error installing fzf for {user}")
                 logging.error(f"Error in install_fzf for {user}: {str(e)}")
                 return False
         else:
             print(f"{KaliStyle.WARNING} fzf already exists for {user}, skipping installation")
         return True
 
-    def install_neovim(self):
-        print(f"\n{KaliStyle.INFO} Installing Neovim and NvChad...")
-        nvim_url = "https://github.com/neovim/neovim/releases/download/nightly/nvim-linux-x86_64.tar.gz"
-        nvim_archive = os.path.join(self.script_dir, "nvim-linux-x86_64.tar.gz")
-        backup_archive = os.path.join(self.script_dir, "nvim-x86_64.tar.gz")
-        
+    def repo_source(self, name):
+        if not (self.bundle and self.bundle.artifact(name)):
+            return self.REMOTE_ARTIFACTS[name]['repo']
+        with self.bundle_lock:
+            path = os.path.join(self.temp_dir, os.path.basename(self.bundle.artifact(name)['member']))
+            if not os.path.exists(path):
+                self.bundle.extract_artifact(name, self.temp_dir)
+            return path
+
+    def mirror_repo(self, name):
+        with self.mirror_lock:
+            lock = self.mirror_locks.setdefault(name, threading.Lock())
+        with lock:
+            if name in self.mirrored:
+                return self.mirrored[name]
+            mirror = os.path.join(self.mirror_dir, f"{name}.git")
+            source = self.repo_source(name)
+            with self.tracer.span(f"mirror {name}", 'git', source=source):
+                try:
+                    if os.path.isdir(mirror):
+                        self.tracer.run(["git", "--git-dir", mirror, "remote", "set-url", "origin", source], check=True, capture_output=True)
+                        self.tracer.run(["git", "--git-dir", mirror, "fetch", "--prune", "--quiet", "origin"], check=True, capture_output=True)
+                    else:
+                        os.makedirs(self.mirror_dir, exist_ok=True)
+                        self.tracer.run(["git", "clone", "--mirror", "--quiet", source, mirror], check=True, capture_output=True)
+                except (subprocess.CalledProcessError, OSError) as e:
+                    logging.error(f"Could not update mirror of {name}: {str(e)}")
+                    if not os.path.isdir(os.path.join(mirror, "objects")):
+                        shutil.rmtree(mirror, ignore_errors=True)
+                        mirror = None
+            self.mirrored[name] = mirror
+            return mirror
+
+    def clone_commands(self, name, dest, shallow=False, hardlinks=True, source=None):
+        url = self.REMOTE_ARTIFACTS[name]['repo']
+        mirror = source or self.mirror_repo(name)
+        if mirror is None:
+            source = self.repo_source(name)
+            if source == url:
+                return [["git", "clone"] + (["--depth", "1"] if shallow else []) + [url, dest]]
+            mirror = source
+        clone = ["git", "-c", "safe.directory=*", "clone", "--quiet"] + ([] if hardlinks else ["--no-hardlinks"]) + [mirror, dest]
+        return [clone, ["git", "-C", dest, "remote", "set-url", "origin", url]]
+
+    def clone_ops(self, name, dest, shallow=False, source=None):
+        ops = [{'op': 'mkdir', 'path': os.path.dirname(dest)}]
+        return ops + [{'op': 'run', 'argv': command} for command in self.clone_commands(name, dest, shallow, hardlinks=False, source=source)]
+
+    def stage_sources(self, dash_zip=None):
+        sources = {'install.py': os.path.realpath(__file__), f"bin/{self.PANEL_DAEMON}.py": os.path.join(self.script_dir, "bin", f"{self.PANEL_DAEMON}.py")}
+        for name in ("terminator", "kitty"):
+            sources[name] = os.path.join(self.script_dir, name)
+        for ext in self.CUSTOM_EXTENSIONS:
+            sources[f"gnome-extensions/{ext}"] = os.path.join(self.script_dir, "gnome-extensions", ext)
+        if dash_zip:
+            sources[os.path.basename(dash_zip)] = dash_zip
+        for name in ('fzf', 'nvchad'):
+            mirror = self.mirror_repo(name) or self.repo_source(name)
+            if os.path.exists(mirror):
+                sources[f"git/{name}"] = mirror
+        return self.broker.call('stage', sources=sources)
+
+    def as_user(self, user, stage, *ops):
         try:
-            urllib.request.urlretrieve(nvim_url, nvim_archive)
-            archive_to_use = nvim_archive
-            opt_archive = "/opt/nvim-linux-x86_64.tar.gz"
-        except Exception as download_error:
-            print(f"{KaliStyle.WARNING} Error downloading Neovim. Using local backup...")
-            if os.path.exists(backup_archive):
-                archive_to_use = backup_archive
-                opt_archive = "/opt/nvim-x86_64.tar.gz"
-            else:
-                print(f"{KaliStyle.ERROR} Backup not found {backup_archive}")
-                logging.error(f"Backup not found {backup_archive}")
+            return self.broker.call('as_user', user=user, script=os.path.join(stage, 'install.py'), ops=list(ops))
+        except BrokerError as e:
+            logging.error(f"Privileged broker error: {str(e)}")
+            return None
+
+    def user_profile(self, user):
+        home = self.home_dir if user == self.current_user else sysroot(pwd.getpwnam(user).pw_dir)
+        return {
+            'user': user,
+            'home': home,
+            'config_dir': os.path.join(home, '.config'),
+            'extensions_dir': os.path.join(home, '.local/share/gnome-shell/extensions')
+        }
+
+    def user_runner(self, user):
+        def runner(argv, input=None, **kwargs):
+            try:
+                result = self.broker.call('run', argv=['dbus-run-session', '--'] + argv, input=input, user=user)
+            except BrokerError as e:
+                raise subprocess.CalledProcessError(1, argv, stderr=str(e))
+            return subprocess.CompletedProcess(argv, result['returncode'], result['stdout'], result['stderr'])
+        return runner
+
+    def provision_user(self, profile, stage, dash_zip=None):
+        user, home = profile['user'], profile['home']
+        with self.tracer.span(f"provision {user}", 'user'):
+            target_file = os.path.join(profile['config_dir'], "bin", "target", "target.txt")
+            with open(os.path.join(self.script_dir, ".zshrc")) as f:
+                zshrc = f"{f.read().rstrip()}\n\n{self.aliases_block(user, target_file)}"
+            functions_dir = os.path.join(home, ZshStartup.FUNCTIONS_DIR)
+            zshrc, functions = ZshStartup.rewrite(zshrc, functions_dir)
+            trees = self.manifest.data.setdefault('trees', {})
+            zshrc_path = os.path.join(home, ".zshrc")
+            ops = [
+                {'op': 'write', 'path': zshrc_path, 'data': zshrc, 'backup': f"{zshrc_path}.backup.{time.strftime('%Y%m%d_%H%M%S')}"},
+                {'op': 'mkdir', 'path': os.path.dirname(target_file)},
+                {'op': 'touch', 'path': target_file},
+                {'op': 'mkdir', 'path': functions_dir}
+            ]
+            for name, body in functions.items():
+                ops.append({'op': 'write', 'path': os.path.join(functions_dir, name), 'data': body})
+            ops.append({'op': 'run', 'argv': ZshStartup.compile_command(zshrc_path, functions_dir=functions_dir)})
+            for name in ("terminator", "kitty"):
+                dest_dir = os.path.join(profile['config_dir'], name)
+                ops.append({'op': 'sync_tree', 'src_dir': os.path.join(stage, name),
+                            'dest_dir': dest_dir, 'previous': trees.get(dest_dir)})
+            for ext in self.CUSTOM_EXTENSIONS:
+                dest_dir = os.path.join(profile['extensions_dir'], ext)
+                ops.append({'op': 'sync_tree', 'src_dir': os.path.join(stage, "gnome-extensions", ext),
+                            'dest_dir': dest_dir, 'previous': trees.get(dest_dir)})
+            daemon = self.panel_daemon_paths(home)
+            ops += [
+                {'op': 'mkdir', 'path': os.path.dirname(daemon['script'])},
+                {'op': 'deploy', 'src': os.path.join(stage, "bin", f"{self.PANEL_DAEMON}.py"), 'dest': daemon['script'], 'mode': 0o755},
+                {'op': 'mkdir', 'path': os.path.dirname(daemon['wants'])},
+                {'op': 'write', 'path': daemon['unit'], 'data': self.PANEL_DAEMON_UNIT},
+                {'op': 'symlink', 'src': daemon['unit'], 'dest': daemon['wants']}
+            ]
+            if dash_zip:
+                ops.append({'op': 'extract_zip', 'archive': os.path.join(stage, os.path.basename(dash_zip)),
+                            'dest_dir': os.path.join(profile['extensions_dir'], self.DASH_TO_PANEL)})
+            results = self.as_user(user, stage, *ops)
+            if results is None:
+                print(f"{KaliStyle.ERROR} Could not deploy dotfiles for {user}")
                 return False
-        
+            for op, result in zip(ops, results):
+                if op['op'] == 'sync_tree':
+                    trees[op['dest_dir']] = result['manifest']
+
+            settings = SettingsBatch(runner=self.user_runner(user))
+            for ext in ([self.DASH_TO_PANEL] if dash_zip else []) + self.CUSTOM_EXTENSIONS:
+                settings.set_extension(ext, True)
+            if not settings.apply():
+                print(f"{KaliStyle.WARNING} Could not enable extensions for {user}")
+
+            fzf_dir = os.path.join(home, ".fzf")
+            nvim_config = os.path.join(profile['config_dir'], "nvim")
+            existing = self.as_user(user, stage, {'op': 'isdir', 'path': fzf_dir}, {'op': 'isdir', 'path': nvim_config})
+            if existing is None:
+                print(f"{KaliStyle.ERROR} Could not inspect the home directory of {user}")
+                return False
+            mirrors = {name: os.path.join(stage, "git", name) for name in ('fzf', 'nvchad')}
+            mirrors = {name: path if os.path.isdir(path) else None for name, path in mirrors.items()}
+            ops = []
+            if not existing[0]:
+                ops += self.clone_ops('fzf', fzf_dir, shallow=True, source=mirrors['fzf'])
+                ops.append({'op': 'run', 'argv': [f"{fzf_dir}/install", "--all"]})
+            if existing[1]:
+                ops.append({'op': 'move', 'src': nvim_config, 'dest': f"{nvim_config}.bak"})
+            ops += self.clone_ops('nvchad', nvim_config, source=mirrors['nvchad'])
+            if self.as_user(user, stage, *ops) is None:
+                print(f"{KaliStyle.ERROR} Could not install fzf/NvChad for {user}")
+                return False
+            print(f"{KaliStyle.SUCCESS} {user} provisioned")
+            return True
+
+    def provision_users(self):
+        print(f"\n{KaliStyle.INFO} Provisioning users: {', '.join(self.users)}")
         try:
-            subprocess.run(["sudo", "cp", archive_to_use, opt_archive], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            profiles = [self.user_profile(user) for user in self.users]
+        except KeyError as e:
+            print(f"{KaliStyle.ERROR} Unknown user: {str(e)}")
+            return False
+        if not self.ask_dash_to_panel_installation():
+            return False
+        dash_zip = None
+        if self.dash_to_panel_installed:
+            try:
+                dash_zip, _ = self.download_dash_to_panel()
+            except Exception as e:
+                print(f"{KaliStyle.ERROR} Error downloading Dash to Panel: {str(e)}")
+                logging.error(f"Error in provision_users: {str(e)}")
+                return False
+        try:
+            stage = self.stage_sources(dash_zip)
+        except BrokerError as e:
+            print(f"{KaliStyle.ERROR} Could not stage sources for the users: {str(e)}")
+            return False
+        try:
+            with ThreadPoolExecutor(max_workers=len(profiles)) as pool:
+                results = list(pool.map(lambda profile: self.provision_user(profile, stage, dash_zip), profiles))
+        finally:
+            self.privileged({'op': 'remove', 'path': stage})
+            self.manifest.save()
+        failed = [profile['user'] for profile, ok in zip(profiles, results) if not ok]
+        if failed:
+            print(f"{KaliStyle.ERROR} Provisioning failed for: {', '.join(failed)}")
+            return False
+        print(f"{KaliStyle.SUCCESS} {len(profiles)} users provisioned")
+        return True
 
-            subprocess.run(["sudo", "tar", "xzf", opt_archive, "-C", "/opt/"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    def download(self, url, dest, sha256=None):
+        with self.tracer.span(f"download: {url}", 'download') as span:
+            result = self.downloader.fetch(url, dest, sha256=sha256)
+            span.update(bytes=result['bytes'], resumed=result['resumed'], cached=result['cached'])
+        if result['resumed']:
+            print(f"{KaliStyle.INFO} Resumed partial download of {os.path.basename(dest)}")
+        return result['path']
+
+    def fetch_checksum(self, checksums_url, filename):
+        try:
+            with self.tracer.span(f"download: {checksums_url}", 'download') as span:
+                body = self.downloader.read(checksums_url)
+                span['bytes'] = len(body)
+                for line in body.decode().splitlines():
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1].lstrip('*') == filename:
+                        return parts[0]
+        except Exception as e:
+            logging.error(f"Could not fetch checksums from {checksums_url}: {str(e)}")
+        return None
 
+    def install_neovim(self):
+        print(f"\n{KaliStyle.INFO} Installing Neovim and NvChad...")
+        if not self.install_neovim_binary():
+            return False
+        
+        try:
             nvim_config = os.path.join(self.config_dir, "nvim")
             if os.path.exists(nvim_config):
                 shutil.move(nvim_config, f"{nvim_config}.bak")
-            subprocess.run(["git", "clone", "https://github.com/NvChad/starter", nvim_config], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "git", "clone", "https://github.com/NvChad/starter", "/root/.config/nvim"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for command in self.clone_commands('nvchad', nvim_config):
+                self.tracer.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for command in self.clone_commands('nvchad', sysroot("/root/.config/nvim"), hardlinks=False):
+                self.broker.call('run', argv=command)
             print(f"{KaliStyle.SUCCESS} Neovim and NvChad installed")
             return True
         except Exception as e:
@@ -586,44 +2764,66 @@ class CombinedInstaller:
             logging.error(f"Error in install_neovim: {str(e)}")
             return False
 
+    def install_neovim_binary(self):
+        nvim_url = self.REMOTE_ARTIFACTS['neovim']['url']
+        checksums_url = self.REMOTE_ARTIFACTS['neovim']['checksums']
+        backup_archive = os.path.join(self.script_dir, "nvim-x86_64.tar.gz")
+
+        if self.bundle and self.bundle.artifact('neovim'):
+            entry = self.bundle.artifact('neovim')
+            try:
+                self.broker.call('install_tarball', source=self.bundle.path, member=entry['member'],
+                                 parent_dir=sysroot("/opt"), sha256=entry['sha256'], required="bin/nvim")
+                print(f"{KaliStyle.SUCCESS} Neovim installed from offline bundle")
+                return True
+            except BrokerError as e:
+                print(f"{KaliStyle.ERROR} Error installing Neovim from offline bundle: {str(e)}")
+                logging.error(f"Error in install_neovim_binary: {str(e)}")
+                return False
+
+        try:
+            expected = self.fetch_checksum(checksums_url, os.path.basename(nvim_url))
+            archive = self.download(nvim_url, os.path.join(self.download_dir, os.path.basename(nvim_url)), sha256=expected)
+            result = self.broker.call('install_tarball', source=archive, parent_dir=sysroot("/opt"), sha256=expected, required="bin/nvim")
+            print(f"{KaliStyle.SUCCESS} Neovim installed into {result['dest']} ({result['bytes'] // 1024} KiB)")
+            return True
+        except Exception as download_error:
+            logging.error(f"Error downloading Neovim: {str(download_error)}")
+            print(f"{KaliStyle.WARNING} Error downloading Neovim. Using local backup...")
+        if not os.path.exists(backup_archive):
+            print(f"{KaliStyle.ERROR} Backup not found {backup_archive}")
+            logging.error(f"Backup not found {backup_archive}")
+            return False
+        try:
+            self.broker.call('install_tarball', source=backup_archive, parent_dir=sysroot("/opt"), required="bin/nvim")
+            return True
+        except BrokerError as e:
+            print(f"{KaliStyle.ERROR} Error installing Neovim: {str(e)}")
+            logging.error(f"Error in install_neovim: {str(e)}")
+            return False
+
     def install_extract_ports(self):
         print(f"\n{KaliStyle.INFO} Installing extractPorts...")
         extractports_path = os.path.join(self.script_dir, "extractPorts.py")
-        dest_path = "/usr/bin/extractPorts.py"
+        dest_path = sysroot("/usr/bin/extractPorts.py")
+        backup_path = f"{dest_path}.bak.{time.strftime('%Y%m%d_%H%M%S')}"
         if os.path.exists(extractports_path):
-            if os.path.exists(dest_path):
+            result = self.deploy_asset(extractports_path, dest_path, mode=0o755, backup=backup_path)
+            if not result:
+                print(f"{KaliStyle.ERROR} Could not copy extractPorts to {dest_path}")
+                return False
+            if not result['changed']:
                 print(f"{KaliStyle.WARNING} extractPorts already installed, skipping.")
                 return True
-            subprocess.run(["chmod", "+x", extractports_path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "cp", extractports_path, dest_path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "chmod", "+x", dest_path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if result['backup']:
+                print(f"{KaliStyle.SUCCESS} Backup created: {result['backup']}")
             print(f"{KaliStyle.SUCCESS} extractPorts installed")
-            self.actions_taken.append({'type': 'file_copy', 'dest': dest_path})
             return True
         return False
         
-    def setup_aliases(self):
-        print(f"\n{KaliStyle.INFO} Setting up aliases...")
-        zshrc_path = f"{self.home_dir}/.zshrc"
-        
-        target_dir = os.path.join(self.config_dir, "bin", "target")
-        os.makedirs(target_dir, exist_ok=True)
-        self.actions_taken.append({'type': 'dir_copy', 'dest': target_dir})
-        print(f"{KaliStyle.SUCCESS} Directory {target_dir} created or verified")
-        
-        target_file = os.path.join(target_dir, "target.txt")
-        try:
-            with open(target_file, 'a') as f:
-                pass
-            self.actions_taken.append({'type': 'file_copy', 'dest': target_file})
-            print(f"{KaliStyle.SUCCESS} File {target_file} created")
-        except Exception as e:
-            print(f"{KaliStyle.ERROR} Error creating {target_file}: {str(e)}")
-            logging.error(f"Error creating {target_file}: {str(e)}")
-            return False
-
+    def aliases_block(self, user, target_file):
         aliases_and_functions = [
-            f"\n# Aliases\nalias {self.current_user}='su {self.current_user}'",
+            f"\n# Aliases\nalias {user}='su {user}'",
             "\nalias bat='batcat'",
             f"""\n# settarget function
     function settarget() {{
@@ -699,9 +2899,45 @@ class CombinedInstaller:
         return 0
     }}"""
         ]
+        return f"{self.ALIASES_BEGIN}{''.join(aliases_and_functions)}\n{self.ALIASES_END}\n"
+
+    @property
+    def managed_aliases(self):
+        return self.aliases_block(self.current_user, os.path.join(self.config_dir, "bin", "target", "target.txt"))
+
+    def setup_aliases(self):
+        print(f"\n{KaliStyle.INFO} Setting up aliases...")
+        zshrc_path = f"{self.home_dir}/.zshrc"
+        
+        target_dir = os.path.join(self.config_dir, "bin", "target")
+        os.makedirs(target_dir, exist_ok=True)
+        self.journal.record({'type': 'dir_copy', 'dest': target_dir})
+        print(f"{KaliStyle.SUCCESS} Directory {target_dir} created or verified")
+        
+        target_file = os.path.join(target_dir, "target.txt")
+        try:
+            with open(target_file, 'a') as f:
+                pass
+            self.journal.record({'type': 'file_copy', 'dest': target_file})
+            print(f"{KaliStyle.SUCCESS} File {target_file} created")
+        except Exception as e:
+            print(f"{KaliStyle.ERROR} Error creating {target_file}: {str(e)}")
+            logging.error(f"Error creating {target_file}: {str(e)}")
+            return False
+
         try:
-            with open(zshrc_path, 'a') as f:
-                f.writelines(aliases_and_functions)
+            content = ''
+            if os.path.exists(zshrc_path):
+                with open(zshrc_path) as f:
+                    content = f.read()
+            block = self.managed_aliases
+            block_pattern = re.compile(rf"{re.escape(self.ALIASES_BEGIN)}.*?{re.escape(self.ALIASES_END)}\n?", re.S)
+            if block_pattern.search(content):
+                content = block_pattern.sub(lambda _: block, content, count=1)
+            else:
+                content = f"{content.rstrip()}\n\n{block}" if content.strip() else block
+            with open(zshrc_path, 'w') as f:
+                f.write(content)
             print(f"{KaliStyle.SUCCESS} Aliases configured")
             return True
         except Exception as e:
@@ -713,9 +2949,18 @@ class CombinedInstaller:
         print(f"\n{KaliStyle.INFO} Installing JetBrainsMono fonts...")
         fonts_archive = os.path.join(self.script_dir, "JetBrainsMono.zip")
         if os.path.exists(fonts_archive):
-            subprocess.run(["sudo", "mkdir", "-p", "/usr/share/fonts/JetBrainsMono"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "unzip", "-o", fonts_archive, "-d", "/usr/share/fonts/JetBrainsMono/"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "fc-cache", "-f", "-v"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            fonts_dir = sysroot("/usr/share/fonts/JetBrainsMono")
+            try:
+                result = self.broker.call('extract_zip', archive=fonts_archive, dest_dir=fonts_dir)
+                if not result['changed']:
+                    print(f"{KaliStyle.SUCCESS} {result['unchanged']} fonts already up to date")
+                    return True
+                self.broker.call('run', argv=["fc-cache", "-f", fonts_dir])
+            except BrokerError as e:
+                print(f"{KaliStyle.ERROR} Could not install fonts")
+                logging.error(f"Error in install_fonts: {str(e)}")
+                return False
+            print(f"{KaliStyle.SUCCESS} {len(result['changed'])} font files updated")
             print(f"{KaliStyle.SUCCESS} Fonts installed")
             return True
         return False
@@ -724,29 +2969,126 @@ class CombinedInstaller:
         print(f"\n{KaliStyle.INFO} Installing sudo plugin...")
         sudo_plugin_dir = os.path.join(self.script_dir, "sudo-plugin")
         if os.path.exists(sudo_plugin_dir):
-            subprocess.run(["sudo", "mkdir", "-p", "/usr/share/sudo-plugin"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "cp", "-r", f"{sudo_plugin_dir}/.", "/usr/share/sudo-plugin/"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(["sudo", "chown", "-R", f"{self.current_user}:{self.current_user}", "/usr/share/sudo-plugin"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if not self.privileged(
+                {'op': 'mkdir', 'path': sysroot("/usr/share/sudo-plugin")},
+                {'op': 'copy', 'src': sudo_plugin_dir, 'dest': sysroot("/usr/share/sudo-plugin")},
+                {'op': 'chown', 'path': sysroot("/usr/share/sudo-plugin"), 'user': self.current_user, 'recursive': True}
+            ):
+                print(f"{KaliStyle.ERROR} Could not install sudo plugin")
+                return False
             print(f"{KaliStyle.SUCCESS} Sudo plugin installed")
             return True
         return False
 
+    def optimize_shell_startup(self, benchmark=True):
+        print(f"\n{KaliStyle.INFO} Optimizing shell startup...")
+        if not self.check_command('zsh'):
+            print(f"{KaliStyle.ERROR} zsh is not installed, cannot optimize shell startup")
+            return False
+        zshrc_path = os.path.join(self.home_dir, '.zshrc')
+        functions_dir = os.path.join(self.home_dir, ZshStartup.FUNCTIONS_DIR)
+        try:
+            before = ZshStartup.benchmark(runs=5) if benchmark else None
+            with open(zshrc_path) as f:
+                content = f.read()
+            existing = os.listdir(functions_dir) if os.path.isdir(functions_dir) else []
+            content, functions = ZshStartup.rewrite(content, functions_dir, existing)
+            os.makedirs(functions_dir, exist_ok=True)
+            for name, body in functions.items():
+                with open(os.path.join(functions_dir, name), 'w') as f:
+                    f.write(body)
+            with open(zshrc_path, 'w') as f:
+                f.write(content)
+            print(f"{KaliStyle.SUCCESS} {len(functions)} functions moved to {functions_dir} for autoloading")
+
+            paths = [zshrc_path] + ([ZshStartup.SUDO_PLUGIN] if os.path.exists(ZshStartup.SUDO_PLUGIN) else [])
+            self.tracer.run(ZshStartup.compile_command(*paths, functions_dir=functions_dir), check=True, capture_output=True)
+            for path in paths + [functions_dir]:
+                self.journal.record({'type': 'file_copy', 'dest': f"{path}.zwc"})
+            print(f"{KaliStyle.SUCCESS} Compiled {len(paths) + 1} files with zcompile")
+
+            if benchmark:
+                after = ZshStartup.benchmark(runs=5)
+                print(f"{KaliStyle.SUCCESS} Shell startup: {before['median'] * 1000:.0f} ms → {after['median'] * 1000:.0f} ms (median of 5)")
+            return True
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"{KaliStyle.ERROR} Error optimizing shell startup: {str(e)}")
+            logging.error(f"Error in optimize_shell_startup: {str(e)}")
+            return False
+
+    def panel_daemon_paths(self, home):
+        unit_dir = os.path.join(home, ".config", "systemd", "user")
+        return {
+            'script': os.path.join(home, ".config", "bin", f"{self.PANEL_DAEMON}.py"),
+            'unit': os.path.join(unit_dir, f"{self.PANEL_DAEMON}.service"),
+            'wants': os.path.join(unit_dir, "default.target.wants", f"{self.PANEL_DAEMON}.service")
+        }
+
+    def install_panel_daemon(self):
+        print(f"\n{KaliStyle.INFO} Installing panel state daemon...")
+        source = os.path.join(self.script_dir, "bin", f"{self.PANEL_DAEMON}.py")
+        if not os.path.exists(source):
+            print(f"{KaliStyle.WARNING} {source} not found, indicators will keep polling")
+            return True
+        paths = self.panel_daemon_paths(self.home_dir)
+        try:
+            if not self.deploy_asset(source, paths['script'], mode=0o755, privileged=False):
+                print(f"{KaliStyle.ERROR} Could not copy {source}")
+                return False
+            os.makedirs(os.path.dirname(paths['unit']), exist_ok=True)
+            with open(paths['unit'], 'w') as f:
+                f.write(self.PANEL_DAEMON_UNIT)
+            self.journal.record({'type': 'file_copy', 'dest': paths['unit']})
+        except OSError as e:
+            print(f"{KaliStyle.ERROR} Error installing panel state daemon: {str(e)}")
+            logging.error(f"Error in install_panel_daemon: {str(e)}")
+            return False
+
+        for command in (['systemctl', '--user', 'daemon-reload'],
+                        ['systemctl', '--user', 'enable', '--now', f"{self.PANEL_DAEMON}.service"]):
+            if not self.run_command(command, quiet=True):
+                print(f"{KaliStyle.WARNING} Could not start {self.PANEL_DAEMON}, it will start on next login")
+                break
+        else:
+            print(f"{KaliStyle.SUCCESS} {self.PANEL_DAEMON} running, indicators now update on change")
+        return True
+
+    def sync_folder(self, source_dir, dest_dir, label):
+        trees = self.manifest.data.setdefault('trees', {})
+        existed = os.path.isdir(dest_dir)
+        result = AssetDeployer.sync_tree(source_dir, dest_dir, trees.get(dest_dir))
+        trees[dest_dir] = result['manifest']
+        self.manifest.save()
+        if not existed:
+            self.journal.record({'type': 'dir_copy', 'dest': dest_dir})
+        else:
+            for relpath in result['created']:
+                self.journal.record({'type': 'file_copy', 'dest': os.path.join(dest_dir, relpath)})
+        if result['copied'] or result['removed']:
+            print(f"{KaliStyle.SUCCESS} {label}: {len(result['copied'])} files updated, "
+                  f"{len(result['removed'])} removed, {result['unchanged']} unchanged")
+            for relpath in result['copied']:
+                logging.info(f"Synced {os.path.join(dest_dir, relpath)}")
+            for relpath in result['removed']:
+                logging.info(f"Removed stale {os.path.join(dest_dir, relpath)}")
+        else:
+            print(f"{KaliStyle.SUCCESS} {label} is already up to date ({result['unchanged']} files)")
+        return result
+
     def install_config_folder(self, source_dir, dest_dir, config_name):
         print(f"\n{KaliStyle.INFO} Installing {config_name} configuration...")
-        if os.path.exists(dest_dir):
-            if os.path.isdir(dest_dir):
-                print(f"{KaliStyle.WARNING} {config_name} configuration already exists, skipping.")
-                return True
-            else:
-                print(f"{KaliStyle.WARNING} {dest_dir} exists but is not a directory, deleting...")
-                os.remove(dest_dir)
-        os.makedirs(dest_dir, exist_ok=True)
-        if os.path.exists(source_dir):
-            shutil.copytree(source_dir, dest_dir, dirs_exist_ok=True)  
-            self.actions_taken.append({'type': 'dir_copy', 'dest': dest_dir})
-            print(f"{KaliStyle.SUCCESS} {config_name} configuration installed")
+        if not os.path.exists(source_dir):
+            return False
+        if os.path.exists(dest_dir) and not os.path.isdir(dest_dir):
+            print(f"{KaliStyle.WARNING} {dest_dir} exists but is not a directory, deleting...")
+            os.remove(dest_dir)
+        try:
+            self.sync_folder(source_dir, dest_dir, f"{config_name} configuration")
             return True
-        return False
+        except OSError as e:
+            print(f"{KaliStyle.ERROR} Error installing {config_name} configuration: {str(e)}")
+            logging.error(f"Error syncing {source_dir} to {dest_dir}: {str(e)}")
+            return False
 
     def install_terminator_config(self):
         return self.install_config_folder(
@@ -774,14 +3116,16 @@ class CombinedInstaller:
                 print(f"{KaliStyle.ERROR} Wallpaper not found in {wallpaper_file}")
                 return False
 
-            os.makedirs(wallpaper_dest_dir, exist_ok=True)
-
-            shutil.copy2(wallpaper_file, wallpaper_dest_path)
-            self.actions_taken.append({'type': 'file_copy', 'dest': wallpaper_dest_path})
+            if not self.deploy_asset(self.image_source(wallpaper_file), wallpaper_dest_path, privileged=False):
+                print(f"{KaliStyle.ERROR} Could not copy wallpaper to {wallpaper_dest_path}")
+                return False
 
-            subprocess.run(['gsettings', 'set', 'org.gnome.desktop.background', 'picture-uri', f"file://{wallpaper_dest_path}"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(['gsettings', 'set', 'org.gnome.desktop.background', 'picture-uri-dark', f"file://{wallpaper_dest_path}"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(['gsettings', 'set', 'org.gnome.desktop.background', 'picture-options', 'zoom'], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.settings.set('org.gnome.desktop.background', 'picture-uri', f"file://{wallpaper_dest_path}")
+            self.settings.set('org.gnome.desktop.background', 'picture-uri-dark', f"file://{wallpaper_dest_path}")
+            self.settings.set('org.gnome.desktop.background', 'picture-options', 'zoom')
+            if not self.settings.apply():
+                print(f"{KaliStyle.ERROR} Could not apply wallpaper settings")
+                return False
             print(f"{KaliStyle.SUCCESS} Wallpaper set")
             return True
         except Exception as e:
@@ -793,7 +3137,7 @@ class CombinedInstaller:
         print(f"\n{KaliStyle.INFO} Setting up GDM wallpaper...")
         wallpaper_source_dir = os.path.join(self.script_dir, "wallpaper")
         wallpaper_source_file = os.path.join(wallpaper_source_dir, "gdm_wallpaper.png")
-        gdm_wallpaper_dest_dir = "/usr/share/backgrounds/kali"
+        gdm_wallpaper_dest_dir = sysroot("/usr/share/backgrounds/kali")
         gdm_wallpaper_dest_file = os.path.join(gdm_wallpaper_dest_dir, "login-blurred")
         backup_file = f"{gdm_wallpaper_dest_file}.bak.{time.strftime('%Y%m%d_%H%M%S')}"
 
@@ -803,26 +3147,15 @@ class CombinedInstaller:
                 return False
             print(f"{KaliStyle.SUCCESS} Wallpaper file found: {wallpaper_source_file}")
 
-            if not os.path.exists(gdm_wallpaper_dest_dir):
-                if not self.run_command(['mkdir', '-p', gdm_wallpaper_dest_dir], sudo=True, quiet=True):
-                    print(f"{KaliStyle.ERROR} Could not create directory {gdm_wallpaper_dest_dir}")
-                    return False
-                print(f"{KaliStyle.SUCCESS} Directory created: {gdm_wallpaper_dest_dir}")
-
-            if os.path.exists(gdm_wallpaper_dest_file):
-                if not self.run_command(['cp', gdm_wallpaper_dest_file, backup_file], sudo=True, quiet=True):
-                    print(f"{KaliStyle.ERROR} Could not create backup of {gdm_wallpaper_dest_file}")
-                    return False
-                self.actions_taken.append({'type': 'file_copy', 'dest': backup_file})
-                print(f"{KaliStyle.SUCCESS} Backup created: {backup_file}")
-
-            if not self.run_command(['cp', wallpaper_source_file, gdm_wallpaper_dest_file], sudo=True, quiet=True):
+            result = self.deploy_asset(self.image_source(wallpaper_source_file), gdm_wallpaper_dest_file, backup=backup_file)
+            if not result:
                 print(f"{KaliStyle.ERROR} Could not copy wallpaper to {gdm_wallpaper_dest_file}")
                 return False
-            if not self.run_command(['chmod', '644', gdm_wallpaper_dest_file], sudo=True, quiet=True):
-                print(f"{KaliStyle.ERROR} Could not set permissions on {gdm_wallpaper_dest_file}")
-                return False
-            self.actions_taken.append({'type': 'file_copy', 'dest': gdm_wallpaper_dest_file})
+            if not result['changed']:
+                print(f"{KaliStyle.SUCCESS} {gdm_wallpaper_dest_file} is already up to date")
+                return True
+            if result['backup']:
+                print(f"{KaliStyle.SUCCESS} Backup created: {backup_file}")
             print(f"{KaliStyle.SUCCESS} Wallpaper copied and renamed to {gdm_wallpaper_dest_file}")
 
             self.needs_gdm_restart = True
@@ -838,7 +3171,7 @@ class CombinedInstaller:
         print(f"\n{KaliStyle.INFO} Setting up browser wallpaper...")
         wallpaper_source_dir = os.path.join(self.script_dir, "wallpaper")
         wallpaper_file = os.path.join(wallpaper_source_dir, "browser-home-page-banner.jpg")
-        target_dir = "/usr/share/kali-defaults/web/images"
+        target_dir = sysroot("/usr/share/kali-defaults/web/images")
         target_file = os.path.join(target_dir, "browser-home-page-banner.jpg")
         backup_file = os.path.join(target_dir, "browser-home-page-banner.jpg.bak")
 
@@ -847,16 +3180,9 @@ class CombinedInstaller:
                 print(f"{KaliStyle.ERROR} Browser wallpaper not found in {wallpaper_file}")
                 return False
 
-            os.makedirs(target_dir, exist_ok=True)
-
-            if os.path.exists(target_file):
-                self.run_command(['mv', target_file, backup_file], sudo=True, quiet=True)
-                self.actions_taken.append({'type': 'file_copy', 'dest': backup_file})
-
-            self.run_command(['cp', wallpaper_file, target_file], sudo=True, quiet=True)
-            self.actions_taken.append({'type': 'file_copy', 'dest': target_file})
-
-            self.run_command(['chmod', '644', target_file], sudo=True, quiet=True)
+            if not self.deploy_asset(wallpaper_file, target_file, backup=backup_file):
+                print(f"{KaliStyle.ERROR} Could not copy browser wallpaper to {target_file}")
+                return False
             print(f"{KaliStyle.SUCCESS} Browser wallpaper configured correctly.")
             return True
         except Exception as e:
@@ -867,41 +3193,38 @@ class CombinedInstaller:
     def setup_grub_images(self):
         print(f"\n{KaliStyle.INFO} Setting up GRUB boot images...")
         wallpaper_source_dir = os.path.join(self.script_dir, "wallpaper")
-        dest_dirs = [
-            "/boot/grub/themes/kali",
-            "/usr/share/grub/themes/kali",
-            "/usr/share/desktop-base/kali-theme/grub"
-        ]
+        dest_dirs = self.GRUB_THEME_DIRS
         image_names = ["grub-16x9.png", "grub-4x3.png"]
 
         try:
-            for dest_dir in dest_dirs:
-                if not os.path.exists(dest_dir):
+            existing_dirs = [dest_dir for dest_dir in dest_dirs if os.path.exists(dest_dir)]
+            backup_suffix = f".bak.{time.strftime('%Y%m%d_%H%M%S')}"
+            changed = False
+            for image_name in image_names:
+                source = os.path.join(wallpaper_source_dir, image_name)
+                if not os.path.exists(source):
+                    print(f"{KaliStyle.ERROR} Image not found: {source}")
                     continue
-                print(f"{KaliStyle.INFO} Updating in {dest_dir}...")
-                for image_name in image_names:
-                    source = os.path.join(wallpaper_source_dir, image_name)
-                    if not os.path.exists(source):
-                        print(f"{KaliStyle.ERROR} Image not found: {source}")
-                        continue
-
-                    dest = os.path.join(dest_dir, image_name)
-                    backup = f"{dest}.bak.{time.strftime('%Y%m%d_%H%M%S')}"
-
-                    if os.path.exists(dest):
-                        if not self.run_command(['cp', dest, backup], sudo=True, quiet=True):
-                            print(f"{KaliStyle.ERROR} Failed to backup {dest}")
-                            continue
-                        self.actions_taken.append({'type': 'backup', 'backup': backup, 'original': dest})
-                        print(f"{KaliStyle.SUCCESS} Backup created: {backup}")
-
-                    if not self.run_command(['cp', source, dest], sudo=True, quiet=True):
-                        print(f"{KaliStyle.ERROR} Failed to copy {source} to {dest}")
+                dests = [os.path.join(dest_dir, image_name) for dest_dir in existing_dirs]
+                try:
+                    results = self.broker.call('deploy_many', src=self.image_source(source), dests=dests, mode=0o644, backup_suffix=backup_suffix)
+                except BrokerError as e:
+                    print(f"{KaliStyle.ERROR} Failed to copy {source}")
+                    logging.error(f"Error deploying {source}: {str(e)}")
+                    continue
+                for result in results:
+                    self.record_deploy(result)
+                    if not result['changed']:
+                        print(f"{KaliStyle.SUCCESS} {result['dest']} is already up to date")
                         continue
-                    self.actions_taken.append({'type': 'file_copy', 'dest': dest})
+                    changed = True
+                    if result['backup']:
+                        print(f"{KaliStyle.SUCCESS} Backup created: {result['backup']}")
+                    print(f"{KaliStyle.SUCCESS} Installed {image_name} in {os.path.dirname(result['dest'])} ({result['method']})")
 
-                    self.run_command(['chmod', '644', dest], sudo=True, quiet=True)
-                    print(f"{KaliStyle.SUCCESS} Installed {image_name} in {dest_dir}")
+            if not changed:
+                print(f"{KaliStyle.SUCCESS} GRUB images already up to date")
+                return True
 
             print(f"{KaliStyle.INFO} Updating GRUB configuration...")
             if not self.run_command(['update-grub'], sudo=True, quiet=True):
@@ -917,20 +3240,19 @@ class CombinedInstaller:
 
     def setup_ctf_folders(self):
         print(f"\n{KaliStyle.INFO} Setting up CTF folders...")
-        ctf_folders = [
-            "/root/machines_vuln/HTB",
-            "/root/machines_vuln/Vulnhub",
-            "/root/machines_vuln/DockerLabs"
-        ]
+        ctf_folders = self.CTF_FOLDERS
 
         try:
-            for folder in ctf_folders:
-                check_result = subprocess.run(['sudo', 'test', '-d', folder], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                if check_result.returncode == 0:
+            existing = self.broker.batch([{'op': 'isdir', 'path': folder} for folder in ctf_folders])
+            missing = []
+            for folder, result in zip(ctf_folders, existing):
+                if result['ok'] and result['value']:
                     print(f"{KaliStyle.WARNING} Folder {folder} already exists")
-                    continue
-                self.run_command(['mkdir', '-p', folder], sudo=True, quiet=True)
-                self.actions_taken.append({'type': 'dir_copy', 'dest': folder})
+                else:
+                    missing.append(folder)
+            self.privileged(*[{'op': 'mkdir', 'path': folder} for folder in missing])
+            for folder in missing:
+                self.journal.record({'type': 'dir_copy', 'dest': folder})
                 print(f"{KaliStyle.SUCCESS} Created folder {folder}")
             print(f"\n{KaliStyle.SUCCESS} CTF folders configured")
             return True
@@ -946,30 +3268,26 @@ class CombinedInstaller:
         
         for key in default_keys + shell_keys:
             schema = 'org.gnome.settings-daemon.plugins.media-keys' if key in default_keys else 'org.gnome.shell.keybindings'
-            subprocess.run(['gsettings', 'set', schema, key, '[]'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.settings.set(schema, key, [])
 
-        shortcuts = [
-            {"name": "Terminator", "command": "/usr/bin/terminator", "shortcut": "<Super>Return"},
-            {"name": "Obsidian", "command": "/usr/bin/obsidian", "shortcut": "<Super><Shift>o"},
-            {"name": "Screenshot", "command": "flameshot gui", "shortcut": "Print"},
-            {"name": "Burpsuite", "command": "/usr/bin/burpsuite", "shortcut": "<Super><Shift>b"},
-            {"name": "Firefox", "command": "/usr/bin/firefox", "shortcut": "<Super><Shift>f"},
-            {"name": "Nautilus", "command": "/usr/bin/nautilus", "shortcut": "<Super>e"}
-        ]
+        shortcuts = self.KEYBOARD_SHORTCUTS
 
-        paths = [f"'/org/gnome/settings-daemon/plugins/media-keys/custom-keybindings/custom{i}/'" for i in range(len(shortcuts))]
-        subprocess.run(['gsettings', 'set', 'org.gnome.settings-daemon.plugins.media-keys', 'custom-keybindings', f"[{', '.join(paths)}]"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        paths = [f"/org/gnome/settings-daemon/plugins/media-keys/custom-keybindings/custom{i}/" for i in range(len(shortcuts))]
+        self.settings.set('org.gnome.settings-daemon.plugins.media-keys', 'custom-keybindings', paths)
         for i, shortcut in enumerate(shortcuts):
-            base_path = f"org.gnome.settings-daemon.plugins.media-keys.custom-keybinding:/org/gnome/settings-daemon/plugins/media-keys/custom-keybindings/custom{i}/"
-            subprocess.run(['gsettings', 'set', base_path, 'name', shortcut['name']], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(['gsettings', 'set', base_path, 'command', shortcut['command']], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            subprocess.run(['gsettings', 'set', base_path, 'binding', shortcut['shortcut']], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            base_path = f"org.gnome.settings-daemon.plugins.media-keys.custom-keybinding:{paths[i]}"
+            self.settings.set(base_path, 'name', shortcut['name'])
+            self.settings.set(base_path, 'command', shortcut['command'])
+            self.settings.set(base_path, 'binding', shortcut['shortcut'])
+        if not self.settings.apply():
+            print(f"{KaliStyle.ERROR} Could not apply keyboard shortcuts")
+            return False
+        for shortcut in shortcuts:
             print(f"{KaliStyle.SUCCESS} Shortcut configured: {shortcut['name']}")
         return True
     
 # ------------------------------------- MESSSAGES FINISHING INSTALLATION ------------------------------------- #
     def show_final_message(self):
-        time.sleep(2)
         os.system('clear')
         print(f"\n\t\t[{KaliStyle.BLUE}{KaliStyle.BOLD}+{KaliStyle.RESET}] Installation Summary [{KaliStyle.BLUE}{KaliStyle.BOLD}+{KaliStyle.RESET}]\n\n")
 
@@ -1037,33 +3355,294 @@ class CombinedInstaller:
         print(f"\n{KaliStyle.TURQUOISE}{'═' * 50}{KaliStyle.RESET}")
         print(f"\n{KaliStyle.WARNING}{KaliStyle.BOLD} Important:{KaliStyle.RESET} Restart GNOME Shell {KaliStyle.GREY}(Alt + F2, 'r'){KaliStyle.RESET} or reboot to apply all changes")
 
+    def create_bundle(self, output):
+        print(f"{KaliStyle.INFO} Building offline bundle {output}...")
+        work_dir = tempfile.mkdtemp(prefix='dotfiles-bundle-')
+        try:
+            artifacts = {}
+            neovim = self.REMOTE_ARTIFACTS['neovim']
+            expected = self.fetch_checksum(neovim['checksums'], os.path.basename(neovim['url']))
+            nvim_path = self.download(neovim['url'], os.path.join(work_dir, os.path.basename(neovim['url'])), sha256=expected)
+            artifacts['neovim'] = {'path': nvim_path, 'url': neovim['url']}
+            print(f"{KaliStyle.SUCCESS} Neovim downloaded")
+
+            zip_path, tag = self.download_dash_to_panel(work_dir)
+            artifacts['dash-to-panel'] = {'path': zip_path, 'version': tag}
+
+            for name in ('fzf', 'nvchad'):
+                url = self.REMOTE_ARTIFACTS[name]['repo']
+                mirror = os.path.join(work_dir, f"{name}.git")
+                bundle_path = os.path.join(work_dir, f"{name}.bundle")
+                self.tracer.run(["git", "clone", "--mirror", url, mirror], check=True, capture_output=True)
+                self.tracer.run(["git", "-C", mirror, "bundle", "create", bundle_path, "--all"], check=True, capture_output=True)
+                artifacts[name] = {'path': bundle_path, 'url': url}
+                print(f"{KaliStyle.SUCCESS} Repository {name} bundled")
+
+            index = OfflineBundle.create(output, artifacts, self.script_dir)
+            size = os.path.getsize(output) / (1024 * 1024)
+            print(f"{KaliStyle.SUCCESS} Bundle written to {output}: {len(index['artifacts'])} remote artifacts, {len(index['assets'])} assets, {size:.1f} MiB")
+            return True
+        except Exception as e:
+            print(f"{KaliStyle.ERROR} Error building offline bundle: {str(e)}")
+            logging.error(f"Error in create_bundle: {str(e)}")
+            return False
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
     def cleanup(self):
         print(f"\n{KaliStyle.INFO} Cleaning temporary files...")
+        if self.prefetch is not None:
+            print(f"{KaliStyle.INFO} Waiting for background package downloads to finish...")
+            self.wait_for_prefetch()
+        with self.broker_lock:
+            if self._broker:
+                self._broker.stop()
+                self._broker = None
+        self.downloader.close()
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
             print(f"{KaliStyle.SUCCESS} {KaliStyle.GREEN}Completed{KaliStyle.RESET}")
             return True
         return True
 
-    def rollback(self):
+    def rollback(self, since=0, actions=None):
+        if actions is None:
+            actions = self.journal.actions[since:]
+            del self.journal.actions[since:]
+        if not actions:
+            return
         print(f"{KaliStyle.WARNING} Rolling back changes...")
-        for action in reversed(self.actions_taken):
-            if action['type'] == 'file_copy' and os.path.exists(action['dest']):
-                self.run_command(['rm', action['dest']], sudo=True, quiet=True)
-                print(f"{KaliStyle.SUCCESS} Deleted {action['dest']}")
-            elif action['type'] == 'dir_copy' and os.path.exists(action['dest']):
-                self.run_command(['rm', '-rf', action['dest']], sudo=True, quiet=True)
-                print(f"{KaliStyle.SUCCESS} Deleted {action['dest']}")
+        ops, packages = [], []
+        for action in reversed(actions):
+            if action['type'] in ('file_copy', 'dir_copy'):
+                ops.append({'op': 'remove', 'path': action['dest']})
             elif action['type'] == 'backup' and os.path.exists(action['backup']):
-                self.run_command(['mv', action['backup'], action['original']], sudo=True, quiet=True)
-                print(f"{KaliStyle.SUCCESS} Restored {action['original']} from backup")
+                ops.append({'op': 'move', 'src': action['backup'], 'dest': action['original']})
             elif action['type'] == 'package':
-                print(f"{KaliStyle.WARNING} Rolling back package {action['pkg']}...")
-                self.run_command(['apt', 'remove', '-y', action['pkg']], sudo=True, quiet=True)
+                packages.append(action['pkg'])
+        if ops:
+            if self.privileged(*ops):
+                print(f"{KaliStyle.SUCCESS} Reverted {len(ops)} file changes")
+            else:
+                print(f"{KaliStyle.ERROR} Some file changes could not be reverted, see install.log")
+        if packages:
+            print(f"{KaliStyle.WARNING} Removing packages: {', '.join(packages)}...")
+            self.run_command(self.apt_command('remove', '-y', *packages), sudo=True, quiet=True)
         print(f"{KaliStyle.SUCCESS} Changes rolled back")
 
+    def replay_journal(self):
+        pending = self.journal.pending()
+        if pending:
+            print(f"{KaliStyle.WARNING} The previous run was interrupted, undoing its {len(pending)} unfinished actions")
+            self.rollback(actions=pending)
+        self.journal.reset()
+
+    def get_system_tasks(self):
+        script = lambda *parts: os.path.join(self.script_dir, *parts)
+        return [
+            {'task': self.install_additional_packages, 'description': "Additional packages installation",
+             'outputs': [sysroot('/usr/bin/zsh'), sysroot('/usr/bin/terminator'), sysroot('/usr/bin/kitty'), sysroot('/usr/bin/flameshot')],
+             'params': ['PACKAGES']},
+            {'task': self.install_neovim_binary, 'description': "Neovim installation",
+             'outputs': [sysroot('/opt/nvim-linux-x86_64')]},
+            {'task': self.install_extract_ports, 'description': "extractPorts installation",
+             'inputs': [script("extractPorts.py")], 'outputs': [sysroot('/usr/bin/extractPorts.py')]},
+            {'task': self.install_fonts, 'description': "Fonts installation",
+             'inputs': [script("JetBrainsMono.zip")], 'outputs': [sysroot('/usr/share/fonts/JetBrainsMono')]},
+            {'task': self.install_sudo_plugin, 'description': "Sudo plugin installation",
+             'inputs': [script("sudo-plugin")], 'outputs': [sysroot('/usr/share/sudo-plugin')]},
+            {'task': self.setup_browser_wallpaper, 'description': "Browser wallpaper setup",
+             'inputs': [script("wallpaper", "browser-home-page-banner.jpg")],
+             'outputs': [sysroot('/usr/share/kali-defaults/web/images/browser-home-page-banner.jpg')]},
+            {'task': self.setup_ctf_folders, 'description': "CTF folders setup", 'outputs': self.CTF_FOLDERS},
+            {'task': self.setup_gdm_wallpaper, 'description': "GDM wallpaper setup",
+             'inputs': [script("wallpaper", "gdm_wallpaper.png")],
+             'outputs': [sysroot('/usr/share/backgrounds/kali/login-blurred')],
+             'params': ['optimize_images', 'prescale_images']},
+            {'task': self.setup_grub_images, 'description': "GRUB images setup",
+             'inputs': [script("wallpaper", "grub-16x9.png"), script("wallpaper", "grub-4x3.png")],
+             'outputs': [sysroot('/boot/grub/themes/kali'), sysroot('/usr/share/grub/themes/kali'),
+                         sysroot('/usr/share/desktop-base/kali-theme/grub')],
+             'params': ['optimize_images', 'prescale_images']},
+            {'task': self.provision_users, 'description': "User provisioning",
+             'inputs': [script(".zshrc"), script("terminator"), script("kitty"), script("gnome-extensions"),
+                        script("bin", "panel-state-daemon.py")],
+             'params': ['users', 'dash_to_panel_installed']}
+        ]
+
+    def get_tasks(self):
+        if self.users:
+            return self.get_system_tasks()
+        script = lambda *parts: os.path.join(self.script_dir, *parts)
+        home = lambda *parts: os.path.join(self.home_dir, *parts)
+        custom_extensions = [os.path.join(self.extensions_dir, ext) for ext in self.CUSTOM_EXTENSIONS]
+        return [
+            {'task': self.install_gnome_extensions, 'description': "GNOME extensions installation",
+             'outputs': [os.path.join(self.extensions_dir, "dash-to-panel@jderose9.github.com")],
+             'params': ['dash_to_panel_installed']},
+            {'task': self.install_custom_extensions, 'description': "Custom extensions installation",
+             'inputs': [script("gnome-extensions")], 'outputs': custom_extensions},
+            {'task': self.install_panel_daemon, 'description': "Panel state daemon installation",
+             'inputs': [script("bin", "panel-state-daemon.py")],
+             'outputs': [home(".config", "systemd", "user", "panel-state-daemon.service")]},
+            {'task': self.verify_installation, 'description': "Installation verification",
+             'inputs': [script("dash-to-panel-settings.dconf"), script("top-bar-organizer.dconf"),
+                        script("top-bar-organizer-dash-to-dock.dconf")],
+             'params': ['dash_to_panel_installed']},
+            {'task': self.install_additional_packages, 'description': "Additional packages installation",
+             'outputs': [sysroot('/usr/bin/zsh'), sysroot('/usr/bin/terminator'), sysroot('/usr/bin/kitty'), sysroot('/usr/bin/flameshot')],
+             'params': ['PACKAGES']},
+            {'task': self.setup_dotfiles, 'description': "Dotfiles setup",
+             'inputs': [script(".zshrc")],
+             'outputs': [home(".zshrc"), home(".fzf"), home(".config", "nvim"), sysroot('/opt/nvim-linux-x86_64')]},
+            {'task': self.setup_aliases, 'description': "Aliases setup",
+             'inputs': [script(".zshrc")], 'outputs': [home(".config", "bin", "target")],
+             'params': ['managed_aliases']},
+            {'task': self.install_extract_ports, 'description': "extractPorts installation",
+             'inputs': [script("extractPorts.py")], 'outputs': [sysroot('/usr/bin/extractPorts.py')]},
+            {'task': self.install_fonts, 'description': "Fonts installation",
+             'inputs': [script("JetBrainsMono.zip")], 'outputs': [sysroot('/usr/share/fonts/JetBrainsMono')]},
+            {'task': self.install_sudo_plugin, 'description': "Sudo plugin installation",
+             'inputs': [script("sudo-plugin")], 'outputs': [sysroot('/usr/share/sudo-plugin')]},
+            {'task': self.optimize_shell_startup, 'description': "Shell startup optimization",
+             'inputs': [home(".zshrc"), script("sudo-plugin")],
+             'outputs': [home(".zshrc.zwc"), home(ZshStartup.FUNCTIONS_DIR)]},
+            {'task': self.install_terminator_config, 'description': "Terminator configuration",
+             'inputs': [script("terminator")], 'outputs': [home(".config", "terminator")]},
+            {'task': self.install_kitty_config, 'description': "Kitty configuration",
+             'inputs': [script("kitty")], 'outputs': [home(".config", "kitty")]},
+            {'task': self.configure_keyboard_shortcuts, 'description': "Keyboard shortcuts configuration",
+             'params': ['KEYBOARD_SHORTCUTS']},
+            {'task': self.setup_wallpaper, 'description': "Wallpaper setup",
+             'inputs': [script("wallpaper", "kali-simple-3840x2160.png")],
+             'outputs': [os.path.join(self.pictures_dir, "wallpaper", "kali-simple-3840x2160.png")],
+             'params': ['optimize_images', 'prescale_images']},
+            {'task': self.setup_browser_wallpaper, 'description': "Browser wallpaper setup",
+             'inputs': [script("wallpaper", "browser-home-page-banner.jpg")],
+             'outputs': [sysroot('/usr/share/kali-defaults/web/images/browser-home-page-banner.jpg')]},
+            {'task': self.setup_ctf_folders, 'description': "CTF folders setup", 'outputs': self.CTF_FOLDERS},
+            {'task': self.setup_gdm_wallpaper, 'description': "GDM wallpaper setup",
+             'inputs': [script("wallpaper", "gdm_wallpaper.png")],
+             'outputs': [sysroot('/usr/share/backgrounds/kali/login-blurred')],
+             'params': ['optimize_images', 'prescale_images']},
+            {'task': self.setup_grub_images, 'description': "GRUB images setup",
+             'inputs': [script("wallpaper", "grub-16x9.png"), script("wallpaper", "grub-4x3.png")],
+             'outputs': [sysroot('/boot/grub/themes/kali'), sysroot('/usr/share/grub/themes/kali'),
+                         sysroot('/usr/share/desktop-base/kali-theme/grub')],
+             'params': ['optimize_images', 'prescale_images']}
+        ]
+
+    def task_fingerprint(self, spec):
+        params = {name: getattr(self, name) for name in spec.get('params', [])}
+        outputs = spec.get('outputs', [])
+        hidden = [path for path in outputs if not os.access(os.path.dirname(path), os.X_OK)]
+        if hidden:
+            try:
+                results = self.broker.batch([{'op': 'exists', 'path': path} for path in hidden])
+                params['hidden_outputs'] = {path: result.get('value') for path, result in zip(hidden, results)}
+            except BrokerError as e:
+                logging.error(f"Could not check {', '.join(hidden)}: {str(e)}")
+                params['hidden_outputs'] = None
+            outputs = [path for path in outputs if path not in hidden]
+        return self.manifest.fingerprint(spec.get('inputs', []), outputs, params)
+
+    def apply_zshrc(self):
+        source = os.path.join(self.script_dir, ".zshrc")
+        zshrc_path = os.path.join(self.home_dir, '.zshrc')
+        try:
+            result = AssetDeployer.deploy(source, zshrc_path, mode=None, backup=f"{zshrc_path}.backup")
+            if result['backup']:
+                self.journal.record({'type': 'backup', 'backup': result['backup'], 'original': zshrc_path})
+        except OSError as e:
+            print(f"{KaliStyle.ERROR} Could not copy {source}: {str(e)}")
+            logging.error(f"Error in apply_zshrc: {str(e)}")
+            return False
+        print(f"{KaliStyle.SUCCESS} .zshrc updated")
+        return self.setup_aliases() and self.optimize_shell_startup(benchmark=False)
+
+    def watch_handlers(self):
+        handlers = {os.path.join(self.script_dir, name): (f"dconf load {name}", lambda name=name: self.apply_dconf_layout(name))
+                    for name in self.DCONF_LAYOUTS}
+        handlers[os.path.join(self.script_dir, ".zshrc")] = (".zshrc update", self.apply_zshrc)
+        return handlers
+
+    def watch_actions(self, changed, tasks):
+        handlers = self.watch_handlers()
+        actions = {}
+        for path in sorted(changed):
+            if path in handlers:
+                actions.setdefault(handlers[path][0], (handlers[path][1], None))
+                continue
+            for spec in tasks:
+                if any(path == source or path.startswith(source + os.sep) for source in spec.get('inputs', [])):
+                    actions.setdefault(spec['description'], (spec['task'], spec))
+        return actions
+
+    def apply_change(self, label, action, spec=None):
+        started = time.perf_counter()
+        task_start = len(self.journal.actions)
+        name = spec['task'].__name__ if spec else label
+        self.journal.begin(name)
+        with self.tracer.span(label, 'task', task=name) as span:
+            try:
+                success = action()
+            except Exception as e:
+                logging.error(f"Error applying {label}: {str(e)}")
+                success = False
+            span['status'] = 'done' if success else 'failed'
+        if not success:
+            print(f"{KaliStyle.ERROR} {label} failed, rolling back")
+            self.rollback(task_start)
+            self.journal.end('rolled_back')
+            return False
+        self.journal.end()
+        if spec:
+            self.manifest.mark_done(name, self.task_fingerprint(spec))
+        print(f"{KaliStyle.SUCCESS} {label} applied in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    def watch(self):
+        if self.users:
+            print(f"{KaliStyle.WARNING} --users is ignored in watch mode, changes are applied for {self.current_user} only")
+            self.users = []
+        if not self.check_required_files():
+            return False
+        self.replay_journal()
+        tasks = [spec for spec in self.get_tasks() if spec['task'] != self.verify_installation]
+        paths = {path for spec in tasks for path in spec.get('inputs', []) if path.startswith(self.script_dir + os.sep)}
+        paths |= set(self.watch_handlers())
+        watcher = AssetWatcher(sorted(path for path in paths if os.path.exists(path)))
+        print(f"{KaliStyle.INFO} Watching {len(paths)} assets in {self.script_dir} {KaliStyle.GREY}(Ctrl+C to stop){KaliStyle.RESET}")
+        try:
+            while True:
+                changed = watcher.changes()
+                for label, (action, spec) in self.watch_actions(changed, tasks).items():
+                    print(f"\n{KaliStyle.INFO} Change detected, applying {label}...")
+                    self.apply_change(label, action, spec)
+                self.journal.reset()
+        except KeyboardInterrupt:
+            print(f"\n{KaliStyle.INFO} Watch stopped")
+            return True
+        finally:
+            watcher.close()
+            self.cleanup()
+
+    def export_trace(self):
+        try:
+            self.tracer.export_json(os.path.join(self.script_dir, 'install-trace.json'))
+            self.tracer.export_chrome(os.path.join(self.script_dir, 'install-trace.chrome.json'))
+        except OSError as e:
+            logging.error(f"Could not export trace: {str(e)}")
+        self.tracer.print_summary()
+
     def run(self):
-        if not all([self.check_os(), self.check_sudo_privileges(), self.check_required_files(), self.check_graphical_environment()]):
+        try:
+            return self.run_tasks()
+        finally:
+            self.export_trace()
+
+    def run_tasks(self):
+        if not self.preflight():
             return False
 
         os.system('clear')
@@ -1071,45 +3650,51 @@ class CombinedInstaller:
 
         if not self.check_gnome_requirements():
             return False
-        tasks = [
-            (self.install_gnome_extensions, "GNOME extensions installation"),
-            (self.install_custom_extensions, "Custom extensions installation"),
-            (self.verify_installation, "Installation verification"),
-            (self.install_additional_packages, "Additional packages installation"),
-            (self.setup_dotfiles, "Dotfiles setup"),
-            (self.setup_aliases, "Aliases setup"),
-            (self.install_extract_ports, "extractPorts installation"),
-            (self.install_fonts, "Fonts installation"),
-            (self.install_sudo_plugin, "Sudo plugin installation"),
-            (self.install_terminator_config, "Terminator configuration"),
-            (self.install_kitty_config, "Kitty configuration"),
-            (self.configure_keyboard_shortcuts, "Keyboard shortcuts configuration"),
-            (self.setup_wallpaper, "Wallpaper setup"),
-            (self.setup_browser_wallpaper, "Browser wallpaper setup"),
-            (self.setup_ctf_folders, "CTF folders setup"),
-            (self.setup_gdm_wallpaper, "GDM wallpaper setup"),
-            (self.setup_grub_images, "GRUB images setup")
-        ]
+        self.replay_journal()
+        tasks = self.get_tasks()
+        packages = next((spec for spec in tasks if spec['task'] == self.install_additional_packages), None)
+        if packages and (self.force or not self.manifest.is_current(packages['task'].__name__, self.task_fingerprint(packages))):
+            self.start_package_prefetch()
 
         total_tasks = len(tasks)
+        task_start = 0
+        current_task = None
 
         try:
-            for i, (task, description) in enumerate(tasks, 1):
+            for i, spec in enumerate(tasks, 1):
+                task, description = spec['task'], spec['description']
                 print(f"\n{KaliStyle.GREY}{'─' * 40}{KaliStyle.RESET}")
+                if not self.force and self.manifest.is_current(task.__name__, self.task_fingerprint(spec)):
+                    print(f"{KaliStyle.SUCCESS} ({i}/{total_tasks}) {description} is up to date, skipping")
+                    with self.tracer.span(description, 'task', task=task.__name__, status='skipped'):
+                        pass
+                    continue
                 print(f"{KaliStyle.INFO} ({i}/{total_tasks}) Starting {description}...")
-                if not task():
+                task_start = len(self.journal.actions)
+                current_task = task.__name__
+                self.journal.begin(current_task)
+                with self.tracer.span(description, 'task', task=task.__name__) as span:
+                    success = task()
+                    span['status'] = 'done' if success else 'failed'
+                if not success:
                     print(f"{KaliStyle.ERROR} Error in {description}")
-                    self.rollback()
+                    self.manifest.mark_failed(task.__name__)
+                    self.rollback(task_start)
+                    self.journal.end('rolled_back')
                     self.cleanup()
+                    print(f"{KaliStyle.INFO} Run the installer again to resume from this step")
                     return False
-                time.sleep(0.5)
+                self.journal.end()
+                current_task = None
+                self.manifest.data['settings']['dash_to_panel_installed'] = self.dash_to_panel_installed
+                self.manifest.mark_done(task.__name__, self.task_fingerprint(spec))
             print()
 
             self.show_final_message()
 
             if self.needs_gdm_restart:
                 print(f"{KaliStyle.WARNING} It is necessary to restart GDM to apply the changes.")
-                user_input = input(f"\n\n{KaliStyle.SUDO_COLOR}[*]{KaliStyle.RESET} Do you want to restart GDM now? (Y/n): ").lower()
+                user_input = 'n' if self.assume_yes else input(f"\n\n{KaliStyle.SUDO_COLOR}[*]{KaliStyle.RESET} Do you want to restart GDM now? (Y/n): ").lower()
                 if user_input == '' or user_input == 'y':
                     if not self.run_command(['systemctl', 'restart', 'gdm'], sudo=True, quiet=True):
                         print(f"{KaliStyle.ERROR} Could not restart GDM. Please restart manually with 'sudo systemctl restart gdm'")
@@ -1118,22 +3703,68 @@ class CombinedInstaller:
                 else:
                     print(f"{KaliStyle.WARNING} Please restart GDM manually with 'sudo systemctl restart gdm'")
 
+            self.journal.reset()
             self.cleanup()
             logging.info("Installation completed successfully")
             return True
 
         except KeyboardInterrupt:
             print(f"\n{KaliStyle.WARNING} Installation interrupted")
-            self.rollback()
+            if current_task:
+                self.manifest.mark_failed(current_task)
+                self.rollback(task_start)
+                self.journal.end('rolled_back')
             self.cleanup()
             return False
         except Exception as e:
             print(f"{KaliStyle.ERROR} Error: {str(e)}")
             logging.error(f"General error in run: {str(e)}")
-            self.rollback()
+            if current_task:
+                self.manifest.mark_failed(current_task)
+                self.rollback(task_start)
+                self.journal.end('rolled_back')
             self.cleanup()
             return False
 
 if __name__ == "__main__":
-    installer = CombinedInstaller()
+    parser = argparse.ArgumentParser(description="GNOME dotfiles installer")
+    parser.add_argument('command', nargs='?', default='install', choices=['install', 'bundle', 'benchmark-shell', 'watch', 'verify'],
+                        help="'install' (default), 'bundle' to pack every remote artifact and asset for offline installs, "
+                             "'benchmark-shell' to measure interactive zsh startup time, "
+                             "'watch' to re-apply only the affected step whenever a repo asset changes, "
+                             "or 'verify' to hash every deployed file against the repository and report drift")
+    parser.add_argument('--force', action='store_true', help="ignore the state manifest and run every task again")
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help="non-interactive: install Dash to Panel and never restart GDM")
+    parser.add_argument('--users', type=lambda value: [user for user in value.split(',') if user],
+                        help="comma-separated list of users to provision in parallel (system-wide steps run once)")
+    parser.add_argument('--apt-option', action='append', default=[], metavar='KEY=VALUE',
+                        help="extra apt-get -o option, e.g. Dir::Etc::SourceList=/path/local.list (repeatable)")
+    parser.add_argument('--optimize-images', action='store_true',
+                        help="losslessly recompress wallpaper and GRUB PNGs before deploying them")
+    parser.add_argument('--prescale-images', action='store_true',
+                        help="also downscale them to the detected display resolution (requires Pillow)")
+    parser.add_argument('--bundle', help="install from an offline bundle created with the 'bundle' command")
+    parser.add_argument('--output', default='dotfiles-bundle.zip', help="output path for the 'bundle' command")
+    parser.add_argument('--runs', type=int, default=20, help="number of shells started by 'benchmark-shell'")
+    parser.add_argument('--report', help="also write the 'verify' results as JSON to this path")
+    parser.add_argument('--broker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.broker:
+        PrivilegedBroker.serve()
+        sys.exit(0)
+    if args.command == 'benchmark-shell':
+        stats = ZshStartup.benchmark(runs=max(args.runs, 1))
+        print(f"{KaliStyle.INFO} zsh -i -c exit over {stats['runs']} runs: "
+              f"min {stats['min'] * 1000:.1f} ms, median {stats['median'] * 1000:.1f} ms, mean {stats['mean'] * 1000:.1f} ms")
+        sys.exit(0)
+    installer = CombinedInstaller(force=args.force, users=args.users, bundle=args.bundle, apt_options=args.apt_option,
+                                  optimize_images=args.optimize_images, prescale_images=args.prescale_images,
+                                  assume_yes=args.yes)
+    if args.command == 'bundle':
+        sys.exit(0 if installer.create_bundle(os.path.abspath(args.output)) else 1)
+    if args.command == 'watch':
+        sys.exit(0 if installer.watch() else 1)
+    if args.command == 'verify':
+        sys.exit(0 if installer.verify(args.report) else 1)
     installer.run()
\ No newline at end of file
@@ -0,0 +1,21 @@
+import os
+import sys
+import stat
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+@pytest.fixture
+def stub(tmp_path):
+    calls = tmp_path / 'calls.log'
+
+    def make(name, body=''):
+        path = tmp_path / 'bin' / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f'#!/bin/sh\necho "{name} $*" >> "{calls}"\n{body}\n')
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+        return str(path)
+
+    make.calls = lambda: calls.read_text().splitlines() if calls.exists() else []
+    return make
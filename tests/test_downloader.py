@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+import http.server
+import urllib.parse
+from functools import partial
+
+import pytest
+
+import harness
+import install
+from install import Downloader, DownloadError
+
+PIECE = 64 * 1024
+
+class Server(harness.Handler):
+
+    requests = []
+    fail_from = None
+    signature = 0
+
+    def send_head(self):
+        parts = urllib.parse.urlsplit(self.path)
+        Server.requests.append((self.path, self.headers.get('Range'), self.headers.get('Proxy-Authorization')))
+        if parts.path == '/latest':
+            Server.signature += 1
+            self.send_response(302)
+            self.send_header('Location', f"/data.bin?sig={Server.signature}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+        start = (self.headers.get('Range') or 'bytes=0-').split('=')[1].split('-')[0]
+        if Server.fail_from is not None and int(start) >= Server.fail_from:
+            self.send_error(503)
+            return None
+        self.path = parts.path + (f"?{parts.query}" if parts.query else '')
+        return super().send_head()
+
+class SmallPieces(Downloader):
+    PIECE_SIZE = PIECE
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(install.time, 'sleep', lambda seconds: None)
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / 'www'
+    root.mkdir()
+    payload = os.urandom(10 * PIECE + 123)
+    (root / 'data.bin').write_bytes(payload)
+    Server.requests, Server.fail_from, Server.signature = [], None, 0
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), partial(Server, directory=str(root)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", payload
+    httpd.shutdown()
+    httpd.server_close()
+
+def ranges(since=0):
+    return [int(header.split('=')[1].split('-')[0]) for path, header, _ in Server.requests[since:]
+            if header and path.startswith('/data.bin') and header != 'bytes=0-0']
+
+def test_interrupted_download_resumes_missing_pieces(server, tmp_path):
+    base, payload = server
+    dest = str(tmp_path / 'out' / 'data.bin')
+    Server.fail_from = 6 * PIECE
+    with pytest.raises(DownloadError):
+        SmallPieces(retries=1).fetch(f"{base}/latest", dest)
+    with open(f"{dest}.part.json") as f:
+        state = json.load(f)
+    assert state['url'] == f"{base}/latest"
+    assert sorted(state['done']) == [offset * PIECE for offset in range(6)]
+
+    Server.fail_from = None
+    before = len(Server.requests)
+    result = SmallPieces().fetch(f"{base}/latest", dest)
+    assert result['resumed']
+    assert result['bytes'] == len(payload) - 6 * PIECE
+    assert sorted(ranges(before)) == [offset * PIECE for offset in range(6, 11)]
+    with open(dest, 'rb') as f:
+        assert f.read() == payload
+    assert not os.path.exists(f"{dest}.part.json")
+    assert not os.path.exists(f"{dest}.part")
+
+def test_changed_file_restarts_from_scratch(server, tmp_path):
+    base, payload = server
+    dest = str(tmp_path / 'data.bin')
+    Server.fail_from = 3 * PIECE
+    with pytest.raises(DownloadError):
+        SmallPieces(retries=1).fetch(f"{base}/data.bin", dest)
+    with open(f"{dest}.part.json") as f:
+        state = json.load(f)
+    state['validator'] = 'stale'
+    with open(f"{dest}.part.json", 'w') as f:
+        json.dump(state, f)
+
+    Server.fail_from = None
+    result = SmallPieces().fetch(f"{base}/data.bin", dest)
+    assert not result['resumed']
+    assert result['bytes'] == len(payload)
+
+def test_requests_go_through_the_environment_proxy(server, tmp_path, monkeypatch):
+    base, payload = server
+    monkeypatch.setenv('http_proxy', base.replace('http://', 'http://user:secret@'))
+    monkeypatch.delenv('no_proxy', raising=False)
+    monkeypatch.delenv('NO_PROXY', raising=False)
+    dest = str(tmp_path / 'data.bin')
+    SmallPieces().fetch("http://mirror.invalid/data.bin", dest)
+    with open(dest, 'rb') as f:
+        assert f.read() == payload
+    assert Server.requests
+    assert all(path.startswith('http://mirror.invalid/') for path, _, _ in Server.requests)
+    assert all(auth == 'Basic dXNlcjpzZWNyZXQ=' for _, _, auth in Server.requests)
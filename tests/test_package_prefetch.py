@@ -0,0 +1,78 @@
+import os
+import pwd
+import shutil
+import threading
+import subprocess
+
+import pytest
+
+import install
+from install import CombinedInstaller, PrivilegedBroker, Preflight, Tracer
+
+pytestmark = pytest.mark.skipif(
+    os.getuid() != 0 or not all(shutil.which(tool) for tool in ('apt-get', 'dpkg-deb', 'dpkg-scanpackages')),
+    reason="needs root, apt-get, dpkg-deb and dpkg-scanpackages")
+
+PACKAGE = 'dotfiles-prefetch-probe'
+
+@pytest.fixture
+def apt_options(tmp_path):
+    build = tmp_path / 'build' / PACKAGE
+    (build / 'DEBIAN').mkdir(parents=True)
+    (build / 'DEBIAN' / 'control').write_text(
+        f"Package: {PACKAGE}\nVersion: 1.0\nArchitecture: all\nMaintainer: test <test@localhost>\n"
+        "Description: local repository probe\n")
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    subprocess.run(['dpkg-deb', '--build', str(build), str(repo / f"{PACKAGE}_1.0_all.deb")],
+                   check=True, capture_output=True)
+    packages = subprocess.run(['dpkg-scanpackages', '.', '/dev/null'], cwd=repo, check=True, capture_output=True)
+    (repo / 'Packages').write_bytes(packages.stdout)
+
+    apt = tmp_path / 'apt'
+    for directory in ('parts', 'lists/partial', 'archives/partial', 'cache'):
+        (apt / directory).mkdir(parents=True)
+    (apt / 'status').write_text('')
+    (apt / 'sources.list').write_text(f"deb [trusted=yes] copy:{repo} ./\n")
+    return [f"{key}={value}" for key, value in {
+        'Dir::Etc::SourceList': apt / 'sources.list',
+        'Dir::Etc::SourceParts': apt / 'parts',
+        'Dir::State::Lists': apt / 'lists',
+        'Dir::State::status': apt / 'status',
+        'Dir::Cache': apt / 'cache',
+        'Dir::Cache::Archives': apt / 'archives',
+        'Debug::NoLocking': 'true',
+        'APT::Sandbox::User': 'root'
+    }.items()]
+
+@pytest.fixture
+def installer(tmp_path, apt_options):
+    instance = CombinedInstaller.__new__(CombinedInstaller)
+    instance.PACKAGES = [PACKAGE]
+    instance.apt_options = [arg for option in apt_options for arg in ('-o', option)]
+    instance.current_user = pwd.getpwuid(os.getuid()).pw_name
+    instance.log_dir = str(tmp_path / 'logs')
+    instance.tracer = Tracer()
+    instance.preflight_cache = Preflight(str(tmp_path / 'preflight.json'))
+    instance.prefetch = None
+    instance.broker_lock = threading.Lock()
+    instance._broker = PrivilegedBroker(os.path.realpath(install.__file__), command=[])
+    instance._broker.start()
+    yield instance
+    instance._broker.stop()
+
+def test_prefetch_downloads_from_a_local_repository(installer, tmp_path):
+    installer.start_package_prefetch()
+    assert installer.prefetch is not None
+    assert installer.wait_for_prefetch()
+    archives = os.listdir(tmp_path / 'apt' / 'archives')
+    assert f"{PACKAGE}_1.0_all.deb" in archives
+    with open(os.path.join(installer.log_dir, 'apt-prefetch.root.log')) as f:
+        log = f.read()
+    assert '--download-only' in log and 'Dir::Etc::SourceList=' in log
+
+def test_prefetch_failure_is_reported_not_raised(installer, tmp_path):
+    (tmp_path / 'apt' / 'sources.list').write_text(f"deb [trusted=yes] file:{tmp_path / 'missing'} ./\n")
+    installer.start_package_prefetch()
+    assert installer.wait_for_prefetch() is False
+    assert installer.prefetch is None
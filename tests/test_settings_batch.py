@@ -0,0 +1,52 @@
+from install import SettingsBatch
+
+GSETTINGS = """cat <<'OUT'
+org.gnome.shell enabled-extensions ['dash@local']
+org.gnome.shell disabled-extensions ['panel@local']
+OUT"""
+
+def batch(stub, tmp_path, dconf_status=0):
+    payload = tmp_path / 'payload.ini'
+    dconf = stub('dconf', f'cat > "{payload}"\nexit {dconf_status}')
+    return SettingsBatch(dconf=dconf, gsettings=stub('gsettings', GSETTINGS)), payload
+
+def test_apply_sends_every_section_in_one_dconf_load(stub, tmp_path):
+    settings, payload = batch(stub, tmp_path)
+    settings.set('org.gnome.desktop.interface', 'clock-show-seconds', True)
+    settings.load('/org/gnome/shell/extensions/dash-to-panel/', "[/]\npanel-size=48\n\n[sub]\nanimate=false\n")
+    settings.set_extension('panel@local', True)
+
+    assert settings.apply()
+    assert [call for call in stub.calls() if call.startswith('dconf')] == ['dconf load /']
+    sections, current = {}, None
+    for line in payload.read_text().splitlines():
+        if line.startswith('['):
+            current = sections.setdefault(line[1:-1], {})
+        elif '=' in line:
+            key, value = line.split('=', 1)
+            current[key] = value
+    assert sections['org/gnome/desktop/interface'] == {'clock-show-seconds': 'true'}
+    assert sections['org/gnome/shell/extensions/dash-to-panel'] == {'panel-size': '48'}
+    assert sections['org/gnome/shell/extensions/dash-to-panel/sub'] == {'animate': 'false'}
+    assert sections['org/gnome/shell'] == {'enabled-extensions': "['dash@local', 'panel@local']",
+                                          'disabled-extensions': '@as []'}
+    assert settings.sections == {}
+
+def test_extension_state_is_read_once(stub, tmp_path):
+    settings, _ = batch(stub, tmp_path)
+    for uuid in ('a@local', 'b@local', 'c@local'):
+        settings.set_extension(uuid, True)
+    assert len([call for call in stub.calls() if call.startswith('gsettings')]) == 1
+    assert settings.sections['org/gnome/shell']['enabled-extensions'] == "['dash@local', 'a@local', 'b@local', 'c@local']"
+
+def test_failed_apply_drops_the_batch(stub, tmp_path):
+    settings, _ = batch(stub, tmp_path, dconf_status=1)
+    settings.set_extension('panel@local', True)
+    assert not settings.apply()
+    assert settings.sections == {}
+    assert settings.extensions is None
+
+def test_empty_batch_does_not_run_dconf(stub, tmp_path):
+    settings, _ = batch(stub, tmp_path)
+    assert settings.apply()
+    assert stub.calls() == []